@@ -1,19 +1,48 @@
 import streamlit as st
 from src.data.db_handler import DBHandler
-from src.ui.auth import auth_flow
-from src.ui.dashboard import dashboard_page
-from src.ui.data_entry import data_entry_page
-from src.ui.settings import settings_page
-from src.ui.ai_analytics import ai_analytics_page
-from src.ui.ai_data_entry import ai_data_entry_page
+from src.ui.auth import auth_flow, logout
+from src.ui.debug_panel import profiling_enabled, render_profile_panel
+from src.ui.session_memory import track_session
 from src.ui.i18n import t
+from src.logic.profiling import start_rerun, finish_rerun
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+import importlib
 import os
 
+# Page name -> (module, function). Modules are imported on first visit only,
+# so the login screen does not load pandas, altair, boto3 & co.
+PAGES = {
+    "Dashboard": ("src.ui.dashboard", "dashboard_page"),
+    "Data Entry": ("src.ui.data_entry", "data_entry_page"),
+    "AI Data Import": ("src.ui.ai_data_entry", "ai_data_entry_page"),
+    "AI Analysis": ("src.ui.ai_analytics", "ai_analytics_page"),
+    "Define Data Categories": ("src.ui.settings", "settings_page"),
+}
+
+def load_page(name: str):
+    module_name, function_name = PAGES[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
 # Page config must be the first Streamlit command
 st.set_page_config(page_title="Monthly Data Bot", layout="wide", page_icon="📊")
 
 def main():
+    # Puts back state spilled while this session was idle, evicts other idle sessions
+    track_session()
+    profile = None
+    if profiling_enabled():
+        ctx = get_script_run_ctx()
+        start_rerun(ctx.session_id if ctx else "local")
+    try:
+        render_app()
+    finally:
+        # Also on st.rerun()/st.stop(), the panel is only drawn for completed reruns
+        profile = finish_rerun(st.session_state.get("current_page", "Login"))
+    if profile:
+        render_profile_panel(profile)
+
+def render_app():
     # Initialize language
     if 'language' not in st.session_state:
         st.session_state.language = 'en'
@@ -74,20 +103,12 @@ def main():
             
             st.divider()
             if st.button("Logout"):
-                del st.session_state['user']
+                logout(db)
                 st.rerun()
         
         # Routing
-        if st.session_state.current_page == "Dashboard":
-            dashboard_page(db, user)
-        elif st.session_state.current_page == "Data Entry":
-            data_entry_page(db, user)
-        elif st.session_state.current_page == "AI Data Import":
-            ai_data_entry_page(db, user)
-        elif st.session_state.current_page == "AI Analysis":
-            ai_analytics_page(db, user)
-        elif st.session_state.current_page == "Define Data Categories":
-            settings_page(db, user)
+        if st.session_state.current_page in PAGES:
+            load_page(st.session_state.current_page)(db, user)
 
 if __name__ == "__main__":
     main()
@@ -1,30 +1,176 @@
-import boto3
-from boto3.dynamodb.conditions import Key
 import os
+import re
+import threading
+import time
 import streamlit as st
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from .models import MeterReading, User
+from .metrics import dynamo_metrics
+from .packing import PACKED_PREFIX, pack_readings, packed_sort_key, unpack_readings
+from src.logic.profiling import instrument_dynamo_client, profile_methods
 
+# Data versions live on the user's metadata item: data_version (any change of the user) and
+# data_version_{meter_type} (readings and config of one meter), bumped atomically with every write.
+# Caches use them as part of their key, so every read that fills such a cache entry (readings,
+# meter list, config) is strongly consistent: it sees at least the version read before it.
+# Versions read from DynamoDB are trusted for this long before the next strongly consistent
+# read; writes of this process take effect immediately.
+DATA_VERSION_MAX_AGE_SECONDS = 2.0
+# user_id -> (monotonic time read, {"": user version, meter_type: meter version})
+_data_versions: Dict[str, Tuple[float, Dict[str, int]]] = {}
+_data_versions_lock = threading.Lock()
+
+def clear_data_versions():
+    """
+    Forgets all versions read so far, the next get_data_version reads them again.
+    """
+    with _data_versions_lock:
+        _data_versions.clear()
+
+# Read-modify-write attempts of a packed year bucket before giving up (concurrent writers)
+BUCKET_WRITE_ATTEMPTS = 3
+# Items per BatchWriteItem request (DynamoDB limit)
+BATCH_WRITE_SIZE = 25
+# Actions per TransactWriteItems request (DynamoDB limit)
+TRANSACTION_MAX_ACTIONS = 100
+# Per-month AI quota counters on the user item (quota_YYYY-MM)
+QUOTA_ATTRIBUTE = re.compile(r"quota_\d{4}-\d{2}")
+# Reservation attempts when the counter of the month is created concurrently
+QUOTA_RESERVE_ATTEMPTS = 3
+
+@profile_methods("db")
 class DBHandler:
-    def __init__(self):
-        # Try to get credentials from Streamlit secrets, fallback to env vars or default boto3 chain
+    def __init__(self, dynamo_client=None, packed_readings: Optional[bool] = None):
+        """
+        dynamo_client: optional low-level DynamoDB client to use instead of boto3's
+        (e.g. tools/fake_dynamodb.py for budget and load tests).
+        packed_readings: write readings as packed per-year items (see packing.py) instead of
+        one item per reading. Default: PACKED_READINGS from the secrets or environment.
+        Both layouts are always read, tools/migrate_packed_readings.py converts existing data.
+        """
+        self._packed_readings = packed_readings
         self.region = "eu-central-1" # Default, should be configurable
-        
-        if "AWS_ACCESS_KEY_ID" in st.secrets:
-            self.dynamo = boto3.client(
-                'dynamodb',
-                region_name=st.secrets.get("AWS_DEFAULT_REGION", self.region),
-                aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-                aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"]
-            )
-        else:
-            self.dynamo = boto3.client('dynamodb', region_name=self.region)
+        # Created on first use, the login screen renders without importing boto3
+        self._dynamo = None
+        if dynamo_client is not None:
+            self._dynamo = dynamo_client
+            dynamo_metrics.instrument(self._dynamo)
+            instrument_dynamo_client(self._dynamo)
 
         self.TABLE_NAME = 'meter_reading_bot'
         self.USER_TABLE_NAME = 'meter_reading_users'
         self.HASHKEY = 'chat_id_and_type'
         self.RANGEKEY = 'reading_date'
 
+    @property
+    def dynamo(self):
+        if self._dynamo is None:
+            import boto3
+            # Optional alternative endpoint, e.g. the local stand-in from tools/fake_dynamodb.py
+            endpoint_url = None
+            if "DYNAMODB_ENDPOINT_URL" in st.secrets:
+                endpoint_url = st.secrets["DYNAMODB_ENDPOINT_URL"]
+            endpoint_url = endpoint_url or os.environ.get("DYNAMODB_ENDPOINT_URL") or None
+
+            # Try to get credentials from Streamlit secrets, fallback to env vars or default boto3 chain
+            if "AWS_ACCESS_KEY_ID" in st.secrets:
+                self._dynamo = boto3.client(
+                    'dynamodb',
+                    region_name=st.secrets.get("AWS_DEFAULT_REGION", self.region),
+                    aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
+                    aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
+                    endpoint_url=endpoint_url
+                )
+            elif endpoint_url and boto3.Session().get_credentials() is None:
+                # The local stand-in does not check signatures, but botocore needs something to sign with
+                self._dynamo = boto3.client(
+                    'dynamodb',
+                    region_name=self.region,
+                    aws_access_key_id="local",
+                    aws_secret_access_key="local",
+                    endpoint_url=endpoint_url
+                )
+            else:
+                self._dynamo = boto3.client('dynamodb', region_name=self.region, endpoint_url=endpoint_url)
+            dynamo_metrics.instrument(self._dynamo)
+            instrument_dynamo_client(self._dynamo)
+        return self._dynamo
+
+    @property
+    def packed_readings(self) -> bool:
+        if self._packed_readings is None:
+            value = st.secrets["PACKED_READINGS"] if "PACKED_READINGS" in st.secrets else os.environ.get("PACKED_READINGS")
+            self._packed_readings = str(value).lower() in ("1", "true", "yes")
+        return self._packed_readings
+
+    # --- Data Versioning ---
+    def get_data_version(self, user_id: str, meter_type: Optional[str] = None) -> int:
+        """
+        Version of the user's data (meter_type None) or of one meter. Costs one strongly consistent
+        GetItem at most every DATA_VERSION_MAX_AGE_SECONDS per user and process.
+        """
+        key = str(user_id)
+        with _data_versions_lock:
+            cached = _data_versions.get(key)
+        if cached is None or time.monotonic() - cached[0] > DATA_VERSION_MAX_AGE_SECONDS:
+            versions = self._read_data_versions(key)
+            if versions is None:
+                # Keep using what we had, a failed read must not invalidate all caches
+                versions = cached[1] if cached else {}
+            cached = (time.monotonic(), versions)
+            with _data_versions_lock:
+                _data_versions[key] = cached
+        return cached[1].get(meter_type or "", 0)
+
+    def _read_data_versions(self, user_id: str) -> Optional[Dict[str, int]]:
+        try:
+            response = self.dynamo.get_item(
+                TableName=self.TABLE_NAME,
+                Key={
+                    self.HASHKEY: {'S': user_id},
+                    self.RANGEKEY: {'S': 'metadata'}
+                },
+                ConsistentRead=True
+            )
+            versions = {}
+            for name, value in response.get('Item', {}).items():
+                if name == 'data_version':
+                    versions[""] = int(value['N'])
+                elif name.startswith('data_version_'):
+                    versions[name[len('data_version_'):]] = int(value['N'])
+            return versions
+        except Exception as e:
+            print(f"Error getting data version: {e}")
+            return None
+
+    def _version_update(self, user_id: str, meter_type: Optional[str] = None,
+                        set_expression: str = "", names: Optional[dict] = None, values: Optional[dict] = None) -> dict:
+        """
+        Parameters of an update of the metadata item (update_item or a transaction's Update) that
+        increments the user's and optionally the meter's version, plus an optional SET clause.
+        """
+        names = {**(names or {}), '#dv': 'data_version'}
+        add_expression = "ADD #dv :one"
+        if meter_type is not None:
+            names['#mv'] = f'data_version_{meter_type}'
+            add_expression += ", #mv :one"
+        return {
+            'TableName': self.TABLE_NAME,
+            'Key': {
+                self.HASHKEY: {'S': str(user_id)},
+                self.RANGEKEY: {'S': 'metadata'}
+            },
+            'UpdateExpression': f"{set_expression} {add_expression}".strip(),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': {**(values or {}), ':one': {'N': '1'}}
+        }
+
+    def _forget_data_version(self, user_id: str):
+        # Our own write: re-read on the next check instead of waiting for the window to pass
+        with _data_versions_lock:
+            _data_versions.pop(str(user_id), None)
+
     # --- User Management ---
     def get_user(self, username: str) -> Optional[User]:
         try:
@@ -52,46 +198,125 @@ class DBHandler:
             print(f"Error creating user: {e}")
             return False
 
-    def increment_ai_quota(self, username: str, quota_month: str) -> bool:
+    def revoke_sessions(self, username: str) -> bool:
+        """
+        Bumps the user's session generation: all session tokens issued so far stop working.
+        """
         try:
-            # Atomic counter update
-            # We also set the month to ensure we are resetting if month changed (logic handled in caller usually, but let's be safe)
-            # Actually, simpler: The caller checks the month. If month changed, we set to 1. If same month, we increment.
-            # But DynamoDB 'ADD' is good for increment.
-            
             self.dynamo.update_item(
                 TableName=self.USER_TABLE_NAME,
                 Key={'username': {'S': username}},
-                UpdateExpression="SET ai_quota_used = ai_quota_used + :inc, quota_month = :qm",
-                ExpressionAttributeValues={
-                    ':inc': {'N': '1'},
-                    ':qm': {'S': quota_month}
-                }
+                UpdateExpression="ADD session_generation :one",
+                ConditionExpression="attribute_exists(username)",
+                ExpressionAttributeValues={':one': {'N': '1'}}
             )
             return True
         except Exception as e:
-            print(f"Error incrementing quota: {e}")
+            print(f"Error revoking sessions: {e}")
             return False
-            
-    def reset_ai_quota(self, username: str, quota_month: str) -> bool:
+
+    def reserve_ai_quota(self, username: str, quota_month: str, limit: int) -> Optional[int]:
+        """
+        Atomically reserves one AI request in a single UpdateItem.
+        The counter lives in a per-month attribute (quota_YYYY-MM), so a new month starts at 0
+        without a separate reset. Rejected if the limit is reached.
+        Returns the new count of the month, or None if rejected. Raises on DB errors.
+        """
+        name = f'quota_{quota_month}'
+        for attempt in range(QUOTA_RESERVE_ATTEMPTS):
+            try:
+                response = self.dynamo.update_item(
+                    TableName=self.USER_TABLE_NAME,
+                    Key={'username': {'S': username}},
+                    # ai_quota_used / quota_month mirror the current month for the User model
+                    UpdateExpression="SET #q = if_not_exists(#q, :zero) + :one, "
+                                     "ai_quota_used = if_not_exists(#q, :zero) + :one, quota_month = :qm",
+                    # Without #q, only a new month starts at 0 (a count from before the per-month
+                    # attributes is seeded below)
+                    ConditionExpression="attribute_exists(username) AND "
+                                        "(#q < :limit OR (attribute_not_exists(#q) AND NOT quota_month = :qm))",
+                    ExpressionAttributeNames={'#q': name},
+                    ExpressionAttributeValues={
+                        ':zero': {'N': '0'},
+                        ':one': {'N': '1'},
+                        ':qm': {'S': quota_month},
+                        ':limit': {'N': str(limit)}
+                    },
+                    ReturnValues='ALL_OLD'
+                )
+                old = response.get('Attributes', {})
+                # Counters of earlier months (also skipped ones) are dropped with the first request of a month
+                stale = [k for k in old if QUOTA_ATTRIBUTE.fullmatch(k) and k != name]
+                if stale:
+                    self._remove_attributes(username, stale)
+                return int(old[name]['N']) + 1 if name in old else 1
+            except self.dynamo.exceptions.ConditionalCheckFailedException:
+                pass
+
+            item = self.dynamo.get_item(TableName=self.USER_TABLE_NAME, Key={'username': {'S': username}},
+                                        ConsistentRead=True).get('Item')
+            if not item or name in item or item.get('quota_month', {}).get('S') != quota_month:
+                return None
+            # Counted before the per-month attributes existed: continue from ai_quota_used
+            try:
+                response = self.dynamo.update_item(
+                    TableName=self.USER_TABLE_NAME,
+                    Key={'username': {'S': username}},
+                    UpdateExpression="SET #q = ai_quota_used + :one, ai_quota_used = ai_quota_used + :one",
+                    ConditionExpression="attribute_not_exists(#q) AND quota_month = :qm AND ai_quota_used < :limit",
+                    ExpressionAttributeNames={'#q': name},
+                    ExpressionAttributeValues={
+                        ':one': {'N': '1'},
+                        ':qm': {'S': quota_month},
+                        ':limit': {'N': str(limit)}
+                    },
+                    ReturnValues='UPDATED_NEW'
+                )
+                return int(response['Attributes']['ai_quota_used']['N'])
+            except self.dynamo.exceptions.ConditionalCheckFailedException:
+                # Limit reached or seeded concurrently: check again
+                continue
+        return None
+
+    def _remove_attributes(self, username: str, names: List[str]):
         try:
             self.dynamo.update_item(
                 TableName=self.USER_TABLE_NAME,
                 Key={'username': {'S': username}},
-                UpdateExpression="SET ai_quota_used = :val, quota_month = :qm",
+                UpdateExpression="REMOVE " + ", ".join(f"#a{i}" for i in range(len(names))),
+                ExpressionAttributeNames={f"#a{i}": n for i, n in enumerate(names)}
+            )
+        except Exception as e:
+            # Only clean-up, tried again with the next month's first request
+            print(f"Error removing attributes: {e}")
+
+    def refund_ai_quota(self, username: str, quota_month: str) -> Optional[int]:
+        """
+        Gives back a reserved AI request (e.g. the LLM call failed), single UpdateItem.
+        Returns the new count of the month, or None if there was nothing to refund.
+        """
+        try:
+            response = self.dynamo.update_item(
+                TableName=self.USER_TABLE_NAME,
+                Key={'username': {'S': username}},
+                UpdateExpression="SET #q = #q - :one, ai_quota_used = #q - :one",
+                ConditionExpression="#q > :zero",
+                ExpressionAttributeNames={'#q': f'quota_{quota_month}'},
                 ExpressionAttributeValues={
-                    ':val': {'N': '1'}, # Start at 1 for the new request
-                    ':qm': {'S': quota_month}
-                }
+                    ':zero': {'N': '0'},
+                    ':one': {'N': '1'}
+                },
+                ReturnValues='UPDATED_NEW'
             )
-            return True
+            return int(response['Attributes']['ai_quota_used']['N'])
+        except self.dynamo.exceptions.ConditionalCheckFailedException:
+            return None
         except Exception as e:
-            print(f"Error resetting quota: {e}")
-            return False
+            print(f"Error refunding quota: {e}")
+            return None
 
     def update_user_stats(self, username: str) -> bool:
         try:
-            from datetime import datetime
             today = datetime.now().strftime('%Y-%m-%d')
             
             self.dynamo.update_item(
@@ -109,66 +334,272 @@ class DBHandler:
             return False
 
     # --- Meter Readings ---
-    def get_readings(self, user_id: str, meter_type: str) -> List[MeterReading]:
-        key_condition = Key(self.HASHKEY).eq(f'{user_id}_{meter_type}')
-        
-        # We need to use the Table resource for easier querying with Key objects, 
-        # or construct the low-level query. Let's use low-level for consistency with client.
+    # Two layouts in the partition "{user_id}_{meter_type}": one item per reading (sort key = date)
+    # and packed items per year (sort key "packed#YYYY", see packing.py). Reads merge both, a single
+    # item wins over a packed entry of the same date.
+    def _query_partition(self, partition_key: str, between: Optional[Tuple[str, str]] = None,
+                         keys_only: bool = False) -> List[dict]:
+        """
+        All items of a partition, optionally only sort keys between (first, last) and only the keys.
+        """
+        items, start_key = [], None
+        while True:
+            params = {
+                'TableName': self.TABLE_NAME,
+                'KeyConditionExpression': f"{self.HASHKEY} = :pk",
+                'ExpressionAttributeValues': {':pk': {'S': partition_key}},
+                # Cached under the data version read before: must not be older than that
+                'ConsistentRead': True
+            }
+            if between:
+                params['KeyConditionExpression'] += f" AND {self.RANGEKEY} BETWEEN :first AND :last"
+                params['ExpressionAttributeValues'].update({':first': {'S': between[0]}, ':last': {'S': between[1]}})
+            if keys_only:
+                params['ProjectionExpression'] = f"{self.HASHKEY}, {self.RANGEKEY}"
+            if start_key:
+                params['ExclusiveStartKey'] = start_key
+            response = self.dynamo.query(**params)
+            items.extend(response.get('Items', []))
+            # Results come in pages of up to 1 MB
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                return items
+
+    def _read_partition(self, user_id: str, meter_type: str) -> Tuple[Dict[str, MeterReading], List[dict], List[dict]]:
+        """
+        Returns (readings by date, single items, packed items) of a meter.
+        """
+        readings, single_items, packed_items = {}, [], []
+        for item in self._query_partition(f'{user_id}_{meter_type}'):
+            sort_key = item.get(self.RANGEKEY, {}).get('S', '')
+            if sort_key == 'metadata':
+                continue
+            if sort_key.startswith(PACKED_PREFIX):
+                packed_items.append(item)
+                for reading in unpack_readings(meter_type, item['dates']['B'], item['readings']['B']):
+                    readings.setdefault(reading.reading_date, reading)
+            else:
+                single_items.append(item)
+                reading = MeterReading.from_dynamo_item(item, user_id)
+                readings[reading.reading_date] = reading
+        return readings, single_items, packed_items
+
+    def _packed_item(self, user_id: str, meter_type: str, year: int, readings: List[MeterReading], rev: int) -> dict:
+        dates, values = pack_readings(readings)
+        return {
+            self.HASHKEY: {'S': f'{user_id}_{meter_type}'},
+            self.RANGEKEY: {'S': packed_sort_key(year)},
+            'dates': {'B': dates},
+            'readings': {'B': values},
+            'reading_count': {'N': str(len(readings))},
+            'rev': {'N': str(rev)}
+        }
+
+    def _write_packed(self, user_id: str, meter_type: str, year: int,
+                      upsert: List[MeterReading], remove: List[str]):
+        """
+        Read-modify-write of one packed year in a transaction, which also deletes existing single
+        items of the touched dates (they would shadow the packed values) and bumps the data versions.
+        The bucket's rev attribute detects concurrent writers, the write is then retried with fresh data.
+        Deletes beyond one transaction's TRANSACTION_MAX_ACTIONS follow in further transactions,
+        the version bump always goes with the last one.
+        """
+        partition_key = f'{user_id}_{meter_type}'
+        bucket_key = {self.HASHKEY: {'S': partition_key}, self.RANGEKEY: {'S': packed_sort_key(year)}}
+        touched = {r.reading_date for r in upsert} | set(remove)
+        for attempt in range(BUCKET_WRITE_ATTEMPTS):
+            # Single items are rare (legacy layout): only delete the ones that exist, each costs capacity
+            singles = {item[self.RANGEKEY]['S'] for item in
+                       self._query_partition(partition_key, (f"{year:04d}-01-01", f"{year:04d}-12-31"), keys_only=True)}
+            response = self.dynamo.get_item(TableName=self.TABLE_NAME, Key=bucket_key, ConsistentRead=True)
+            item = response.get('Item')
+            rev = int(item['rev']['N']) if item else 0
+            readings = {r.reading_date: r for r in unpack_readings(meter_type, item['dates']['B'], item['readings']['B'])} if item else {}
+            for reading in upsert:
+                readings[reading.reading_date] = reading
+            for date_str in remove:
+                readings.pop(date_str, None)
+
+            # The bucket must still be the one we read
+            guard = {
+                'ConditionExpression': '#rev = :rev' if item else f'attribute_not_exists({self.HASHKEY})',
+                **({'ExpressionAttributeNames': {'#rev': 'rev'}, 'ExpressionAttributeValues': {':rev': {'N': str(rev)}}} if item else {})
+            }
+            actions = []
+            if readings:
+                actions.append({'Put': {'TableName': self.TABLE_NAME, 'Item': self._packed_item(user_id, meter_type, year, list(readings.values()), rev + 1), **guard}})
+            elif item:
+                actions.append({'Delete': {'TableName': self.TABLE_NAME, 'Key': bucket_key, **guard}})
+            deletes = [{'Delete': {'TableName': self.TABLE_NAME, 'Key': {self.HASHKEY: {'S': partition_key}, self.RANGEKEY: {'S': date_str}}}}
+                       for date_str in sorted(touched & singles)]
+            version = {'Update': self._version_update(user_id, meter_type)}
+
+            first_deletes = TRANSACTION_MAX_ACTIONS - len(actions) - 1
+            actions += deletes[:first_deletes]
+            rest = deletes[first_deletes:]
+            try:
+                self.dynamo.transact_write_items(TransactItems=actions + ([] if rest else [version]))
+            except self.dynamo.exceptions.TransactionCanceledException as e:
+                reasons = [r.get('Code') for r in e.response.get('CancellationReasons', [])]
+                if 'ConditionalCheckFailed' not in reasons or attempt == BUCKET_WRITE_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+                continue
+
+            # The bucket is written, the remaining single items only shadow it until deleted.
+            # Caches refresh with the version bump at the end, once everything is in place.
+            size = TRANSACTION_MAX_ACTIONS - 1
+            for start in range(0, len(rest), size):
+                chunk = rest[start:start + size]
+                self.dynamo.transact_write_items(TransactItems=chunk + ([version] if start + size >= len(rest) else []))
+            return
+
+    def get_readings(self, user_id: str, meter_type: str, strict: bool = False) -> List[MeterReading]:
+        """
+        strict: raise DB errors instead of returning an empty list (results that get cached).
+        """
         try:
-            response = self.dynamo.query(
-                TableName=self.TABLE_NAME,
-                KeyConditionExpression=f"{self.HASHKEY} = :pk",
-                ExpressionAttributeValues={
-                    ':pk': {'S': f'{user_id}_{meter_type}'}
-                }
-            )
-            items = response.get('Items', [])
-            # Filter out metadata if any (though metadata usually has 'metadata' as range key)
-            # Our readings have dates as range key.
-            readings = []
-            for item in items:
-                if item.get(self.RANGEKEY, {}).get('S') == 'metadata':
-                    continue
-                readings.append(MeterReading.from_dynamo_item(item, user_id))
-            return readings
+            readings, _, _ = self._read_partition(user_id, meter_type)
+            return [readings[d] for d in sorted(readings)]
         except Exception as e:
+            if strict:
+                raise
             print(f"Error getting readings: {e}")
             return []
 
     def add_reading(self, user_id: str, reading: MeterReading) -> bool:
         try:
-            self.dynamo.put_item(
-                TableName=self.TABLE_NAME,
-                Item=reading.to_dynamo_item(user_id)
-            )
+            if self.packed_readings:
+                self._write_packed(user_id, reading.meter_type, int(reading.reading_date[:4]), [reading], [])
+            else:
+                self.dynamo.transact_write_items(TransactItems=[
+                    {'Put': {'TableName': self.TABLE_NAME, 'Item': reading.to_dynamo_item(user_id)}},
+                    {'Update': self._version_update(user_id, reading.meter_type)}
+                ])
+            self._forget_data_version(user_id)
             return True
         except Exception as e:
             print(f"Error adding reading: {e}")
             return False
 
+    def add_readings(self, user_id: str, readings: List[MeterReading]) -> bool:
+        """
+        Bulk variant of add_reading (e.g. an import), one reading per meter and date.
+        Single items go out in BatchWriteItem requests of 25 followed by one version bump per meter,
+        packed readings in one transaction per meter and year (more if many single items are replaced).
+        """
+        if not readings:
+            return True
+        by_meter: Dict[str, List[MeterReading]] = {}
+        for reading in readings:
+            by_meter.setdefault(reading.meter_type, []).append(reading)
+        try:
+            if self.packed_readings:
+                for meter_type, meter_readings in by_meter.items():
+                    by_year: Dict[int, List[MeterReading]] = {}
+                    for reading in meter_readings:
+                        by_year.setdefault(int(reading.reading_date[:4]), []).append(reading)
+                    for year, year_readings in sorted(by_year.items()):
+                        self._write_packed(user_id, meter_type, year, year_readings, [])
+            else:
+                try:
+                    self._batch_write([{'PutRequest': {'Item': r.to_dynamo_item(user_id)}} for r in readings])
+                finally:
+                    # Also after a partial write, readers must not keep the old data
+                    for meter_type in by_meter:
+                        self.dynamo.update_item(**self._version_update(user_id, meter_type))
+            return True
+        except Exception as e:
+            print(f"Error adding readings: {e}")
+            return False
+        finally:
+            self._forget_data_version(user_id)
+
     def delete_reading(self, user_id: str, meter_type: str, date_str: str) -> bool:
         try:
-            self.dynamo.delete_item(
-                TableName=self.TABLE_NAME,
-                Key={
-                    self.HASHKEY: {'S': f'{user_id}_{meter_type}'},
-                    self.RANGEKEY: {'S': date_str}
-                }
-            )
+            if self.packed_readings:
+                self._write_packed(user_id, meter_type, int(date_str[:4]), [], [date_str])
+            else:
+                self.dynamo.transact_write_items(TransactItems=[
+                    {'Delete': {'TableName': self.TABLE_NAME, 'Key': {
+                        self.HASHKEY: {'S': f'{user_id}_{meter_type}'},
+                        self.RANGEKEY: {'S': date_str}
+                    }}},
+                    {'Update': self._version_update(user_id, meter_type)}
+                ])
+            self._forget_data_version(user_id)
             return True
         except Exception as e:
             print(f"Error deleting reading: {e}")
             return False
 
+    def _batch_write(self, requests: List[dict]):
+        for start in range(0, len(requests), BATCH_WRITE_SIZE):
+            pending = {self.TABLE_NAME: requests[start:start + BATCH_WRITE_SIZE]}
+            for attempt in range(8):
+                response = self.dynamo.batch_write_item(RequestItems=pending)
+                pending = response.get('UnprocessedItems') or {}
+                if not pending:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"{len(pending[self.TABLE_NAME])} items not written (throttled)")
+
+    def convert_readings_layout(self, user_id: str, meter_type: str, packed: bool, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Converts the readings of a meter to the packed (packed=True) or the single-item layout.
+        New items are written before the old ones are deleted, so readers see complete data at
+        any time. Packed buckets are written conditionally: a bucket changed meanwhile by the app
+        is left alone (run again). Returns counts of readings, written and deleted items.
+        """
+        readings, single_items, packed_items = self._read_partition(user_id, meter_type)
+        result = {"readings": len(readings), "written": 0, "deleted": 0}
+        old_items = single_items if packed else packed_items
+        if not old_items:
+            return result
+
+        if packed:
+            existing = {item[self.RANGEKEY]['S']: int(item['rev']['N']) for item in packed_items}
+            by_year: Dict[int, List[MeterReading]] = {}
+            for reading in readings.values():
+                by_year.setdefault(int(reading.reading_date[:4]), []).append(reading)
+            for year, year_readings in sorted(by_year.items()):
+                sort_key = packed_sort_key(year)
+                rev = existing.get(sort_key)
+                if not dry_run:
+                    self.dynamo.put_item(
+                        TableName=self.TABLE_NAME,
+                        Item=self._packed_item(user_id, meter_type, year, year_readings, (rev or 0) + 1),
+                        ConditionExpression='#rev = :rev' if rev is not None else f'attribute_not_exists({self.HASHKEY})',
+                        **({'ExpressionAttributeNames': {'#rev': 'rev'}, 'ExpressionAttributeValues': {':rev': {'N': str(rev)}}} if rev is not None else {})
+                    )
+                result["written"] += 1
+        else:
+            if not dry_run:
+                self._batch_write([{'PutRequest': {'Item': r.to_dynamo_item(user_id)}} for r in readings.values()])
+            result["written"] = len(readings)
+
+        if not dry_run:
+            self._batch_write([{'DeleteRequest': {'Key': {k: item[k] for k in (self.HASHKEY, self.RANGEKEY)}}} for item in old_items])
+            # Same readings, but caches of other processes may hold a partial read of the conversion
+            self.dynamo.update_item(**self._version_update(user_id, meter_type))
+            self._forget_data_version(user_id)
+        result["deleted"] = len(old_items)
+        return result
+
     # --- Metadata / Configuration ---
-    def get_meter_types(self, user_id: str) -> List[str]:
+    def get_meter_types(self, user_id: str, strict: bool = False) -> List[str]:
+        """
+        strict: raise DB errors instead of returning an empty list (results that get cached).
+        """
         try:
             response = self.dynamo.get_item(
                 TableName=self.TABLE_NAME,
                 Key={
                     self.HASHKEY: {'S': str(user_id)},
                     self.RANGEKEY: {'S': 'metadata'}
-                }
+                },
+                ConsistentRead=True
             )
             if 'Item' in response:
                 item = response['Item']
@@ -181,6 +612,8 @@ class DBHandler:
                         return sorted(item['meter_types']['SS'])
             return []
         except Exception as e:
+            if strict:
+                raise
             print(f"Error getting meter types: {e}")
             return []
 
@@ -189,58 +622,56 @@ class DBHandler:
         dynamo_list = [{'S': mt} for mt in meter_types]
             
         try:
-            self.dynamo.update_item(
-                TableName=self.TABLE_NAME,
-                Key={
-                    self.HASHKEY: {'S': str(user_id)},
-                    self.RANGEKEY: {'S': 'metadata'}
-                },
-                UpdateExpression="SET meter_types = :mt",
-                ExpressionAttributeValues={
-                    ':mt': {'L': dynamo_list}
-                }
-            )
+            self.dynamo.update_item(**self._version_update(
+                user_id,
+                set_expression="SET meter_types = :mt",
+                values={':mt': {'L': dynamo_list}}
+            ))
+            self._forget_data_version(user_id)
             return True
         except Exception as e:
             print(f"Error updating meter types: {e}")
             return False
 
-    def get_meter_config(self, user_id: str, meter_type: str, config_key: str) -> Optional[str]:
+    def get_meter_config(self, user_id: str, meter_type: str, config_key: str, strict: bool = False) -> Optional[str]:
         # config_key is 'unit' or 'title'
         # stored as unit_{meter_type} or title_{meter_type}
-        full_key = f"{config_key}_{meter_type}"
+        # strict: raise DB errors instead of returning None (results that get cached)
+        return self.get_meter_configs(user_id, meter_type, [config_key], strict)[config_key]
+
+    def get_meter_configs(self, user_id: str, meter_type: str, config_keys: List[str],
+                          strict: bool = False) -> Dict[str, Optional[str]]:
+        """
+        Several config values of a meter (e.g. unit and eval_mode) from one GetItem of the metadata item.
+        Missing values (and all of them on a DB error, unless strict) are None.
+        """
         try:
             response = self.dynamo.get_item(
                 TableName=self.TABLE_NAME,
                 Key={
                     self.HASHKEY: {'S': str(user_id)},
                     self.RANGEKEY: {'S': 'metadata'}
-                }
+                },
+                ConsistentRead=True
             )
-            if 'Item' in response:
-                return response['Item'].get(full_key, {}).get('S')
-            return None
+            item = response.get('Item', {})
+            return {key: item.get(f"{key}_{meter_type}", {}).get('S') for key in config_keys}
         except Exception as e:
+            if strict:
+                raise
             print(f"Error getting config: {e}")
-            return None
+            return {key: None for key in config_keys}
 
     def update_meter_config(self, user_id: str, meter_type: str, config_key: str, value: str) -> bool:
         full_key = f"{config_key}_{meter_type}"
         try:
-            self.dynamo.update_item(
-                TableName=self.TABLE_NAME,
-                Key={
-                    self.HASHKEY: {'S': str(user_id)},
-                    self.RANGEKEY: {'S': 'metadata'}
-                },
-                UpdateExpression="SET #k = :val",
-                ExpressionAttributeNames={
-                    '#k': full_key
-                },
-                ExpressionAttributeValues={
-                    ':val': {'S': value}
-                }
-            )
+            self.dynamo.update_item(**self._version_update(
+                user_id, meter_type,
+                set_expression="SET #k = :val",
+                names={'#k': full_key},
+                values={':val': {'S': value}}
+            ))
+            self._forget_data_version(user_id)
             return True
         except Exception as e:
             print(f"Error updating config: {e}")
@@ -0,0 +1,190 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Dict
+
+# Aggregates are written here every EXPORT_INTERVAL_SECONDS (on the next recorded call)
+EXPORT_PATH = os.path.join(".cache", "dynamodb_metrics.json")
+EXPORT_INTERVAL_SECONDS = 60
+
+# Upper bounds of the latency histogram buckets in ms (last bucket: everything above)
+LATENCY_BUCKETS_MS = (2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+THROTTLE_ERRORS = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+# Operations accepting ReturnConsumedCapacity
+CAPACITY_OPERATIONS = {"GetItem", "PutItem", "UpdateItem", "DeleteItem", "Query", "Scan", "BatchGetItem",
+                       "BatchWriteItem", "TransactGetItems", "TransactWriteItems"}
+READ_OPERATIONS = {"GetItem", "Query", "Scan", "BatchGetItem", "TransactGetItems"}
+
+class _OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.throttles = 0
+        self.retries = 0
+        self.items = 0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.latency_sum_ms = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def latency_percentile(self, pct: float):
+        """
+        Upper bound of the bucket containing the percentile (None above the last bucket).
+        """
+        target = self.calls * pct / 100
+        seen = 0
+        for i, count in enumerate(self.latency_buckets):
+            seen += count
+            if count and seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "items": self.items,
+            "read_units": round(self.read_units, 2),
+            "write_units": round(self.write_units, 2),
+            "latency_ms_avg": round(self.latency_sum_ms / self.calls, 1) if self.calls else None,
+            "latency_ms_p50": self.latency_percentile(50),
+            "latency_ms_p95": self.latency_percentile(95),
+            "latency_ms_p99": self.latency_percentile(99),
+            # Cumulative counts per upper bound ("inf" = all calls), Prometheus style
+            "latency_histogram": dict(zip(
+                [str(b) for b in LATENCY_BUCKETS_MS] + ["inf"],
+                [sum(self.latency_buckets[:i + 1]) for i in range(len(self.latency_buckets))]
+            ))
+        }
+
+class DynamoMetrics:
+    """
+    In-process registry of all DynamoDB calls (per table and operation): latency histogram,
+    consumed capacity, retries, throttles and item counts. Fed by botocore event hooks,
+    so DBHandler's own error handling stays untouched.
+    """
+    def __init__(self, export_path: str = EXPORT_PATH, export_interval: float = EXPORT_INTERVAL_SECONDS):
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, _OperationStats] = {}
+        self._started = time.time()
+        self._last_export = time.time()
+
+    def instrument(self, client):
+        # unique_id: instrumenting the same client again (e.g. one shared client, a DBHandler per rerun) is a no-op
+        events = client.meta.events
+        events.register("provide-client-params.dynamodb.*", self._on_params, unique_id="metrics-params")
+        events.register("before-call.dynamodb.*", self._on_before_call, unique_id="metrics-before-call")
+        events.register("needs-retry.dynamodb.*", self._on_needs_retry, unique_id="metrics-needs-retry")
+        events.register("after-call.dynamodb.*", self._on_after_call, unique_id="metrics-after-call")
+        events.register("after-call-error.dynamodb.*", self._on_call_error, unique_id="metrics-call-error")
+        return client
+
+    # --- botocore hooks ---
+    def _on_params(self, params, model, context, **kwargs):
+        context["metrics_table"] = params.get("TableName", "-")
+        if model.name in CAPACITY_OPERATIONS:
+            params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    def _on_before_call(self, context, **kwargs):
+        context["metrics_start"] = time.perf_counter()
+
+    def _on_needs_retry(self, response, **kwargs):
+        # Called after every attempt; a throttled attempt is retried by botocore and never reaches after-call
+        if response is not None:
+            code = response[1].get("Error", {}).get("Code")
+            if code in THROTTLE_ERRORS:
+                kwargs["request_dict"]["context"]["metrics_throttles"] = \
+                    kwargs["request_dict"]["context"].get("metrics_throttles", 0) + 1
+        return None  # Never influence the retry decision
+
+    def _on_after_call(self, http_response, parsed, model, context, **kwargs):
+        capacities = parsed.get("ConsumedCapacity") or []
+        if isinstance(capacities, dict):
+            capacities = [capacities]
+        read_units = write_units = 0.0
+        for capacity in capacities:
+            units = capacity.get("CapacityUnits", 0.0) or 0.0
+            if model.name in READ_OPERATIONS:
+                read_units += units
+            else:
+                write_units += units
+
+        if model.name in ("Query", "Scan"):
+            items = parsed.get("Count", 0)
+        elif model.name == "GetItem":
+            items = 1 if "Item" in parsed else 0
+        elif model.name == "BatchGetItem":
+            items = sum(len(v) for v in parsed.get("Responses", {}).values())
+        elif http_response.status_code < 300:
+            items = 1
+        else:
+            items = 0
+
+        self._record(
+            context, model.name,
+            error=http_response.status_code >= 300,
+            retries=parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+            items=items, read_units=read_units, write_units=write_units
+        )
+
+    def _on_call_error(self, context, exception, event_name, **kwargs):
+        # Connection errors etc. (no HTTP response)
+        self._record(context, event_name.rsplit(".", 1)[-1], error=True)
+
+    def _record(self, context, operation: str, error: bool = False, retries: int = 0,
+                items: int = 0, read_units: float = 0.0, write_units: float = 0.0):
+        latency_ms = (time.perf_counter() - context.get("metrics_start", time.perf_counter())) * 1000
+        key = (context.get("metrics_table", "-"), operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _OperationStats()
+            stats.calls += 1
+            stats.errors += 1 if error else 0
+            stats.throttles += context.get("metrics_throttles", 0)
+            stats.retries += retries
+            stats.items += items
+            stats.read_units += read_units
+            stats.write_units += write_units
+            stats.latency_sum_ms += latency_ms
+            stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            export_due = time.time() - self._last_export >= self.export_interval
+            if export_due:
+                self._last_export = time.time()
+        if export_due:
+            self.export()
+
+    # --- Export ---
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self._started,
+                "exported_at": time.time(),
+                "operations": {f"{table}/{operation}": stats.summary()
+                               for (table, operation), stats in sorted(self._stats.items())}
+            }
+
+    def export(self):
+        """
+        Writes the current snapshot as JSON (overwrites the previous export).
+        """
+        snapshot = self.snapshot()
+        try:
+            if os.path.dirname(self.export_path):
+                os.makedirs(os.path.dirname(self.export_path), exist_ok=True)
+            tmp_path = self.export_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.export_path)
+        except OSError as e:
+            print(f"Error exporting DynamoDB metrics: {e}")
+
+# Process-wide registry, shared by all sessions
+dynamo_metrics = DynamoMetrics()
@@ -2,6 +2,9 @@ from dataclasses import dataclass
 from datetime import date, datetime
 from typing import Optional
 
+# AI requests per user per month (hard limit)
+QUOTA_LIMIT = 50
+
 @dataclass
 class MeterReading:
     meter_type: str
@@ -38,6 +41,7 @@ class User:
     quota_month: str = "" # YYYY-MM
     last_login: str = ""  # YYYY-MM-DD
     login_count: int = 0
+    session_generation: int = 0  # Bumped on logout, session tokens of older generations are revoked
 
     def to_dynamo_item(self) -> dict:
         return {
@@ -48,7 +52,8 @@ class User:
             'ai_quota_used': {'N': str(self.ai_quota_used)},
             'quota_month': {'S': self.quota_month},
             'last_login': {'S': self.last_login},
-            'login_count': {'N': str(self.login_count)}
+            'login_count': {'N': str(self.login_count)},
+            'session_generation': {'N': str(self.session_generation)}
         }
 
     @staticmethod
@@ -61,5 +66,6 @@ class User:
             ai_quota_used=int(item.get('ai_quota_used', {}).get('N', 0)),
             quota_month=item.get('quota_month', {}).get('S', ''),
             last_login=item.get('last_login', {}).get('S', ''),
-            login_count=int(item.get('login_count', {}).get('N', 0))
+            login_count=int(item.get('login_count', {}).get('N', 0)),
+            session_generation=int(item.get('session_generation', {}).get('N', 0))
         )
@@ -0,0 +1,104 @@
+import struct
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Tuple
+from .models import MeterReading
+
+# Packed layout of meter_reading_bot: one item per meter and year, sort key "packed#YYYY",
+# with the dates and values of the year as delta-encoded binary arrays (see DBHandler).
+PACKED_PREFIX = "packed#"
+
+# Values with up to this many decimals are stored as scaled integers, others as raw float64
+MAX_SCALE = 9
+_FIXED_POINT = 0
+_FLOAT64 = 1
+_EPOCH = date(1970, 1, 1)
+
+def packed_sort_key(year: int) -> str:
+    return f"{PACKED_PREFIX}{year:04d}"
+
+def _write_varint(out: bytearray, number: int):
+    while True:
+        byte = number & 0x7F
+        number >>= 7
+        if number:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    number = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        number |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return number, pos
+        shift += 7
+
+def _zigzag(number: int) -> int:
+    return number * 2 if number >= 0 else -number * 2 - 1
+
+def _unzigzag(number: int) -> int:
+    return number // 2 if number % 2 == 0 else -(number + 1) // 2
+
+def _decimals(value: float) -> int:
+    exponent = Decimal(repr(value)).as_tuple().exponent
+    return max(0, -exponent) if isinstance(exponent, int) else MAX_SCALE + 1
+
+def pack_readings(readings: List[MeterReading]) -> Tuple[bytes, bytes]:
+    """
+    Encodes the readings of one meter-year (one per date) as (dates, values) blobs.
+    dates: count, first day since 1970-01-01, then day deltas (varints).
+    values: format byte, then either scale + zigzag varint deltas of value * 10^scale,
+    or raw little-endian float64 if a value has more than MAX_SCALE decimals. Lossless for floats.
+    """
+    ordered = sorted(readings, key=lambda r: r.reading_date)
+
+    dates = bytearray()
+    _write_varint(dates, len(ordered))
+    previous = 0
+    for i, reading in enumerate(ordered):
+        day = (date.fromisoformat(reading.reading_date) - _EPOCH).days
+        _write_varint(dates, _zigzag(day) if i == 0 else day - previous)
+        previous = day
+
+    values = bytearray()
+    scale = max((_decimals(r.meter_reading) for r in ordered), default=0)
+    if scale > MAX_SCALE:
+        values.append(_FLOAT64)
+        values += struct.pack(f"<{len(ordered)}d", *(r.meter_reading for r in ordered))
+    else:
+        values.append(_FIXED_POINT)
+        values.append(scale)
+        previous = 0
+        for reading in ordered:
+            scaled = int(Decimal(repr(reading.meter_reading)).scaleb(scale))
+            _write_varint(values, _zigzag(scaled - previous))
+            previous = scaled
+    return bytes(dates), bytes(values)
+
+def unpack_readings(meter_type: str, dates: bytes, values: bytes) -> List[MeterReading]:
+    """
+    Inverse of pack_readings, readings sorted by date.
+    """
+    count, pos = _read_varint(dates, 0)
+    days = []
+    for i in range(count):
+        number, pos = _read_varint(dates, pos)
+        days.append(_unzigzag(number) if i == 0 else days[-1] + number)
+
+    if values[0] == _FLOAT64:
+        numbers = list(struct.unpack_from(f"<{count}d", values, 1))
+    else:
+        scale, pos, scaled = values[1], 2, 0
+        numbers = []
+        for _ in range(count):
+            delta, pos = _read_varint(values, pos)
+            scaled += _unzigzag(delta)
+            # True division of ints is correctly rounded, so this returns the original float
+            numbers.append(scaled / 10 ** scale)
+
+    return [MeterReading(meter_type, value, (_EPOCH + timedelta(days=day)).isoformat())
+            for day, value in zip(days, numbers)]
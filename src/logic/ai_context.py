@@ -0,0 +1,243 @@
+import hashlib
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from src.data.db_handler import DBHandler
+from src.logic.analytics import aggregate_consumption
+from src.logic.cache import shared_cache
+from src.logic.datasets import CACHE_MAX_AGE_SECONDS, get_meter_types, load_meter
+from src.logic.llm_client import LLMClient
+from src.logic.profiling import profiled
+
+# Contexts up to this size are sent completely (all months), larger accounts get a compact
+# overview of at most OVERVIEW_TOKEN_BUDGET and fetch details through the analytics tools
+# (see analytics_tools.py)
+INLINE_CONTEXT_MAX_TOKENS = 3000
+OVERVIEW_TOKEN_BUDGET = 1500
+# Rough chars per token of the CSV lines, used while searching for a layout that fits
+CHARS_PER_TOKEN = 3.0
+
+# Layouts from most to least detailed: (months at full resolution, granularity of older data)
+# None = all months at full resolution
+CONTEXT_LAYOUTS = [
+    (None, None),
+    (36, 'season'),
+    (24, 'season'),
+    (24, 'year'),
+    (12, 'year'),
+    (6, 'year'),
+    (0, 'year'),
+]
+
+@dataclass
+class DataContext:
+    meter_count: int  # Number of defined meter types
+    text: str         # Prompt-ready CSV as sent to the model, empty if there is nothing to analyze
+    token_count: int = 0  # Of text
+    token_count_exact: bool = False  # False if token_count is only an estimate
+    layout: str = ""  # Description of the resolution of text
+    use_tools: bool = False  # text is only an overview, details come through the analytics tools
+    data_hash: str = ""  # Hash of the full-resolution data, stable across processes (response cache key)
+
+def _estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def format_aggregates(data_summary: Dict[str, Any], period: str) -> str:
+    """
+    Prompt-friendly CSV of yearly/seasonal aggregates (computed by analytics.aggregate_consumption).
+    Counter meters are described by their total, direct values by their mean.
+    """
+    label = "Year" if period == 'year' else "Season"
+    parts = [f"Meter Type, {label}, Total, Avg/Month, Min, Max, Months, Unit"]
+
+    for meter_type, info in data_summary.items():
+        df = info.get('df')
+        if df is None or df.empty:
+            continue
+        agg = aggregate_consumption(df, period)
+        if agg.empty:
+            continue
+
+        # A sum of direct values (e.g. body weight) is meaningless
+        if info.get('mode') == 'absolute':
+            totals = np.full(len(agg), "-", dtype=object)
+        else:
+            totals = np.char.mod("%.2f", agg['total'].to_numpy(dtype=float))
+
+        lines = (f"{meter_type}, " + agg['period'] + ", " + totals
+                 + ", " + np.char.mod("%.2f", agg['mean'].to_numpy(dtype=float))
+                 + ", " + np.char.mod("%.2f", agg['min'].to_numpy(dtype=float))
+                 + ", " + np.char.mod("%.2f", agg['max'].to_numpy(dtype=float))
+                 + ", " + agg['months'].astype(str) + f", {info.get('unit', 'Units')}")
+        parts.append("\n".join(lines.tolist()))
+
+    return "\n".join(parts)
+
+def _render_layout(data_summary: Dict[str, Any], recent_months: Optional[int], older: Optional[str]) -> str:
+    recent, past = {}, {}
+    for meter_type, info in data_summary.items():
+        df = info['df']
+        if recent_months is None:
+            recent[meter_type] = info
+            continue
+        split = max(len(df) - recent_months, 0)
+        if split < len(df):
+            recent[meter_type] = {**info, 'df': df.iloc[split:]}
+        if split > 0:
+            past[meter_type] = {**info, 'df': df.iloc[:split]}
+
+    sections = []
+    if past:
+        sections.append(f"# {'Yearly' if older == 'year' else 'Seasonal'} aggregates (older data)\n" + format_aggregates(past, older))
+    if recent:
+        title = "# Monthly values" if recent_months is None else f"# Monthly values (last {recent_months} months per meter)"
+        sections.append(title + "\n" + LLMClient.format_readings(recent))
+    return "\n\n".join(sections)
+
+def _largest_fitting(limit: int, fits) -> int:
+    # fits(n) is monotonic (smaller n, shorter text): largest n in 1..limit that fits, 0 if none
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def _trim_overview(data_summary: Dict[str, Any], token_budget: int) -> Tuple[str, str]:
+    """
+    Last resort of build_budgeted_context if even yearly aggregates of all data are too long
+    (many meters or years): only the most recent years, then only as many meters as fit,
+    finally a hard cut. The model fetches the rest through the analytics tools.
+    """
+    def recent_years(years: int, meters: int) -> Dict[str, Any]:
+        trimmed = {}
+        for meter_type, info in list(data_summary.items())[:meters]:
+            year = info['df']['date'].dt.year
+            trimmed[meter_type] = {**info, 'df': info['df'][year > year.max() - years]}
+        return trimmed
+
+    def render(years: int, meters: int) -> str:
+        text = f"# Yearly aggregates (last {years} years per meter)\n" + format_aggregates(recent_years(years, meters), 'year')
+        if meters < len(data_summary):
+            text += f"\n# {len(data_summary) - meters} more meters not shown, see list_meters"
+        return text
+
+    def fits(text: str) -> bool:
+        return _estimate_tokens(text) <= token_budget
+
+    meter_count = len(data_summary)
+    max_years = max(int(info['df']['date'].dt.year.max() - info['df']['date'].dt.year.min()) + 1
+                    for info in data_summary.values())
+    years = _largest_fitting(max_years, lambda n: fits(render(n, meter_count)))
+    if years:
+        return render(years, meter_count), f"last {years} years"
+    meters = _largest_fitting(meter_count, lambda n: fits(render(1, n)))
+    if meters:
+        return render(1, meters), f"last year, {meters} of {meter_count} meters"
+    text = render(1, 1)[:int(token_budget * CHARS_PER_TOKEN)]
+    return text[:max(text.rfind("\n"), 0)], "truncated"
+
+@profiled("analytics")
+def build_budgeted_context(data_summary: Dict[str, Any], token_budget: int = OVERVIEW_TOKEN_BUDGET,
+                           rendered: Optional[Dict[int, str]] = None) -> Tuple[str, str]:
+    """
+    Formats the data summary so it fits into token_budget.
+    Recent months stay at full resolution, older periods are compacted into
+    seasonal and then yearly aggregates until the estimate fits. If even that is too long,
+    older years and then meters are left out (see _trim_overview).
+    rendered: optional dict shared between calls on the same data, so each layout is formatted once.
+    Returns (text, layout description).
+    """
+    rendered = {} if rendered is None else rendered
+
+    def text_of(index: int) -> str:
+        if index not in rendered:
+            rendered[index] = _render_layout(data_summary, *CONTEXT_LAYOUTS[index])
+        return rendered[index]
+
+    # Layouts get shorter from one to the next: binary search for the most detailed one that fits
+    low, high = 0, len(CONTEXT_LAYOUTS) - 1
+    while low < high:
+        middle = (low + high) // 2
+        if _estimate_tokens(text_of(middle)) <= token_budget:
+            high = middle
+        else:
+            low = middle + 1
+
+    if _estimate_tokens(text_of(low)) > token_budget:
+        return _trim_overview(data_summary, token_budget)
+
+    recent_months, older = CONTEXT_LAYOUTS[low]
+    layout = "monthly" if recent_months is None else f"{recent_months} months + {older}"
+    return text_of(low), layout
+
+@profiled("analytics")
+def load_dataset(db: DBHandler, user_id: str) -> Dict[str, Any]:
+    """
+    Loads readings, config and monthly analytics of all meters of a user.
+    The meters come from the shared cache (datasets.load_meter), so the prompt context,
+    the analytics tools and the dashboard work on the same objects.
+    Structure: {meter_type: {"unit", "mode", "df" (monthly), "readings"}}; meters without
+    enough data for monthly values are left out. The meter type list is under the key None.
+    Raises on DB errors (a context built from a failed read must not be cached).
+    """
+    meter_types = get_meter_types(db, user_id, strict=True)
+    dataset = {None: meter_types}
+    for mt in meter_types:
+        info = load_meter(db, user_id, mt)
+        # Monthly stats give the LLM the processed "intelligence"
+        if not info["df"].empty:
+            dataset[mt] = info
+    return dataset
+
+def _build_data_context(db: DBHandler, user_id: str, llm_client: Optional[LLMClient] = None) -> DataContext:
+    dataset = load_dataset(db, user_id)
+    meter_types = dataset[None]
+    data_summary = {mt: info for mt, info in dataset.items() if mt is not None}
+
+    if not data_summary:
+        return DataContext(meter_count=len(meter_types), text="")
+
+    full_text = LLMClient.format_readings(data_summary)
+    data_hash = hashlib.sha256(full_text.encode("utf-8")).hexdigest()
+    monthly = _render_layout(data_summary, *CONTEXT_LAYOUTS[0])
+
+    # Exact counts from Bedrock if possible (cached with the context, so only once per data version).
+    # Only the text that is actually sent is counted.
+    if _estimate_tokens(monthly) <= INLINE_CONTEXT_MAX_TOKENS:
+        token_count = llm_client.count_tokens(monthly) if llm_client else None
+        if token_count is None or token_count <= INLINE_CONTEXT_MAX_TOKENS:
+            return DataContext(
+                meter_count=len(meter_types),
+                text=monthly,
+                token_count=token_count if token_count is not None else _estimate_tokens(monthly),
+                token_count_exact=token_count is not None,
+                layout="monthly",
+                data_hash=data_hash
+            )
+
+    overview, layout = build_budgeted_context(data_summary, OVERVIEW_TOKEN_BUDGET, {0: monthly})
+    token_count = llm_client.count_tokens(overview) if llm_client else None
+    return DataContext(
+        meter_count=len(meter_types),
+        text=overview,
+        token_count=token_count if token_count is not None else _estimate_tokens(overview),
+        token_count_exact=token_count is not None,
+        layout=layout,
+        use_tools=True,
+        data_hash=data_hash
+    )
+
+@profiled("analytics")
+def get_data_context(db: DBHandler, user_id: str, llm_client: Optional[LLMClient] = None) -> DataContext:
+    """
+    Returns the AI analytics context of a user: all monthly values up to INLINE_CONTEXT_MAX_TOKENS,
+    otherwise an overview for the tool-use mode.
+    Built once per data version (and CACHE_MAX_AGE_SECONDS at most): as long as no reading or
+    meter config changed, chat turns are served from memory without any DB or analytics work.
+    """
+    version = db.get_data_version(user_id)
+    return shared_cache.get_or_compute(("context", str(user_id), version), lambda: _build_data_context(db, user_id, llm_client),
+                                       CACHE_MAX_AGE_SECONDS)
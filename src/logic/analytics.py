@@ -1,5 +1,6 @@
 import pandas as pd
 from src.data.models import MeterReading
+from src.logic.profiling import profiled
 
 def process_readings(readings: list[MeterReading]) -> pd.DataFrame:
     if not readings:
@@ -23,6 +24,7 @@ def process_readings(readings: list[MeterReading]) -> pd.DataFrame:
     
     return df
 
+@profiled("analytics")
 def calculate_monthly_consumption(readings: list[MeterReading], eval_mode: str = 'difference') -> pd.DataFrame:
     if not readings:
         return pd.DataFrame()
@@ -87,6 +89,7 @@ def calculate_monthly_consumption(readings: list[MeterReading], eval_mode: str =
     
     return result
 
+@profiled("analytics")
 def calculate_yearly_stats(readings: list[MeterReading], monthly_df: pd.DataFrame) -> pd.DataFrame:
     if not readings or monthly_df.empty:
         return pd.DataFrame()
@@ -161,3 +164,33 @@ def calculate_yearly_stats(readings: list[MeterReading], monthly_df: pd.DataFram
         })
         
     return pd.DataFrame(stats)
+
+@profiled("analytics")
+def aggregate_consumption(monthly_df: pd.DataFrame, period: str = 'year') -> pd.DataFrame:
+    """
+    Compacts the monthly values into yearly or seasonal aggregates.
+    period: 'year' or 'season' (meteorological seasons, December counts to the next winter)
+    Returns columns: period, total, mean, min, max, months
+    """
+    if monthly_df.empty:
+        return pd.DataFrame(columns=['period', 'total', 'mean', 'min', 'max', 'months'])
+
+    df = monthly_df[['date', 'consumption']].copy()
+    
+    if period == 'season':
+        month = df['date'].dt.month
+        season_year = df['date'].dt.year + (month == 12).astype(int)
+        season_names = pd.Series(["Winter", "Spring", "Summer", "Autumn"])
+        season_idx = (month % 12) // 3
+        df['period'] = season_year.astype(str) + "-" + season_names.iloc[season_idx].to_numpy()
+        # Keeps chronological order when grouping (Winter < Spring < Summer < Autumn)
+        df['sort_key'] = season_year * 4 + season_idx
+    else:
+        df['period'] = df['date'].dt.year.astype(str)
+        df['sort_key'] = df['date'].dt.year
+
+    result = df.groupby(['sort_key', 'period'])['consumption'].agg(
+        total='sum', mean='mean', min='min', max='max', months='count'
+    ).reset_index().sort_values('sort_key')
+    
+    return result.drop(columns=['sort_key']).reset_index(drop=True)
@@ -0,0 +1,153 @@
+import json
+import pandas as pd
+from typing import Any, Dict, Optional
+from src.logic.datasets import yearly_stats
+
+# Max rows returned by get_monthly_series, keeps a single tool result small
+MAX_SERIES_ROWS = 120
+
+# Tool definitions in the Anthropic Messages API format
+ANALYTICS_TOOLS = [
+    {
+        "name": "list_meters",
+        "description": "Lists all data categories (meters) of the user with unit, evaluation mode and the available month range.",
+        "input_schema": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "get_monthly_series",
+        "description": "Monthly values of one meter, optionally limited to a month range (inclusive). "
+                       "For counter meters the value is the consumption of the month, for direct values the monthly mean.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "meter_type": {"type": "string"},
+                "start_month": {"type": "string", "description": "YYYY-MM"},
+                "end_month": {"type": "string", "description": "YYYY-MM"}
+            },
+            "required": ["meter_type"]
+        }
+    },
+    {
+        "name": "get_yearly_stats",
+        "description": "Yearly statistics of one meter: total, average per month, average per day and number of readings.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "meter_type": {"type": "string"},
+                "year": {"type": "integer", "description": "Optional, all years if omitted"}
+            },
+            "required": ["meter_type"]
+        }
+    },
+    {
+        "name": "compare_periods",
+        "description": "Compares two month ranges (inclusive, YYYY-MM) of one meter: total, monthly mean and the difference in percent.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "meter_type": {"type": "string"},
+                "period_a_start": {"type": "string"},
+                "period_a_end": {"type": "string"},
+                "period_b_start": {"type": "string"},
+                "period_b_end": {"type": "string"}
+            },
+            "required": ["meter_type", "period_a_start", "period_a_end", "period_b_start", "period_b_end"]
+        }
+    }
+]
+
+def _filter_months(df: pd.DataFrame, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    # month_str is YYYY-MM, so string comparison is chronological
+    if start:
+        df = df[df['month_str'] >= start]
+    if end:
+        df = df[df['month_str'] <= end]
+    return df
+
+def _period_summary(df: pd.DataFrame, mode: str) -> Dict[str, Any]:
+    if df.empty:
+        return {"months": 0}
+    summary = {
+        "months": len(df),
+        "mean_per_month": round(float(df['consumption'].mean()), 2)
+    }
+    # A sum of direct values (e.g. body weight) is meaningless
+    if mode != 'absolute':
+        summary["total"] = round(float(df['consumption'].sum()), 2)
+    return summary
+
+def _pct_change(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    if a is None or b is None or a == 0:
+        return None
+    return round((b - a) / abs(a) * 100, 1)
+
+def run_analytics_tool(dataset: Dict[str, Any], name: str, tool_input: Dict[str, Any]) -> str:
+    """
+    Executes one analytics tool against the cached dataset (see ai_context.load_dataset).
+    Returns a JSON string for the tool_result block. Errors are returned as {"error": ...}
+    so the model can correct its call.
+    """
+    try:
+        return _run_tool(dataset, name, tool_input)
+    except Exception as e:
+        # Malformed model input (e.g. a year that is no number) must not end the chat turn
+        return json.dumps({"error": f"Invalid input for '{name}': {e}"}, ensure_ascii=False)
+
+def _run_tool(dataset: Dict[str, Any], name: str, tool_input: Dict[str, Any]) -> str:
+    meters = {mt: info for mt, info in dataset.items() if mt is not None}
+
+    if name == "list_meters":
+        result = []
+        for mt, info in meters.items():
+            df = info["df"]
+            result.append({
+                "meter_type": mt,
+                "unit": info["unit"],
+                "mode": info["mode"],
+                "first_month": df['month_str'].iloc[0],
+                "last_month": df['month_str'].iloc[-1],
+                "months": len(df)
+            })
+        return json.dumps(result, ensure_ascii=False)
+
+    meter_type = tool_input.get("meter_type")
+    if meter_type not in meters:
+        return json.dumps({"error": f"Unknown meter_type '{meter_type}'", "available": list(meters)}, ensure_ascii=False)
+    info = meters[meter_type]
+
+    if name == "get_monthly_series":
+        df = _filter_months(info["df"], tool_input.get("start_month"), tool_input.get("end_month"))
+        rows = [{"month": m, "value": round(float(v), 2)} for m, v in zip(df['month_str'], df['consumption'])]
+        result = {"meter_type": meter_type, "unit": info["unit"], "values": rows[-MAX_SERIES_ROWS:]}
+        if len(rows) > MAX_SERIES_ROWS:
+            result["note"] = f"Only the last {MAX_SERIES_ROWS} of {len(rows)} months, narrow the range for older data."
+        return json.dumps(result, ensure_ascii=False)
+
+    if name == "get_yearly_stats":
+        stats = yearly_stats(info)
+        if tool_input.get("year") is not None:
+            stats = stats[stats['year'] == int(tool_input["year"])]
+        rows = [{
+            "year": int(row['year']),
+            "data_points": int(row['data_points']),
+            "total": round(float(row['total_consumption']), 2),
+            "avg_monthly": round(float(row['avg_monthly']), 2),
+            "avg_daily": round(float(row['avg_daily']), 2)
+        } for _, row in stats.iterrows()]
+        return json.dumps({"meter_type": meter_type, "unit": info["unit"], "years": rows}, ensure_ascii=False)
+
+    if name == "compare_periods":
+        a = _period_summary(_filter_months(info["df"], tool_input.get("period_a_start"), tool_input.get("period_a_end")), info["mode"])
+        b = _period_summary(_filter_months(info["df"], tool_input.get("period_b_start"), tool_input.get("period_b_end")), info["mode"])
+        result = {
+            "meter_type": meter_type,
+            "unit": info["unit"],
+            "period_a": a,
+            "period_b": b,
+            "mean_change_pct": _pct_change(a.get("mean_per_month"), b.get("mean_per_month"))
+        }
+        if "total" in a and "total" in b:
+            result["total_change_pct"] = _pct_change(a["total"], b["total"])
+        return json.dumps(result, ensure_ascii=False)
+
+    return json.dumps({"error": f"Unknown tool '{name}'"})
@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Global budget of the process-wide shared_cache (SHARED_CACHE_MB in the environment)
+SHARED_CACHE_MAX_BYTES = int(os.environ.get("SHARED_CACHE_MB", "256")) * 1024 * 1024
+
+_SCALARS = (str, bytes, int, float, bool, type(None))
+
+def estimate_size(value: Any, max_depth: int = 4, _seen: Optional[set] = None) -> int:
+    """
+    Rough deep size of a value in bytes: DataFrames/Series via memory_usage(deep=True), numpy arrays
+    via nbytes, containers recursively and other objects through their __dict__ (up to max_depth
+    levels, so e.g. a boto3 client is not walked completely). Objects referenced twice count once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, _SCALARS):
+        return size
+    if hasattr(value, "memory_usage") and hasattr(value, "index"):
+        # pandas DataFrame (per-column Series) or Series (int)
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return max(size, int(value.nbytes))
+    if max_depth <= 0:
+        return size
+
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, max_depth - 1, seen) + estimate_size(v, max_depth - 1, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, max_depth - 1, seen) for v in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), max_depth - 1, seen)
+    return size
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache shared by all sessions of the Streamlit process.
+    Evicts the least recently used entries once max_entries or max_bytes (optional,
+    sizes by estimate_size when stored) is exceeded.
+    """
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        # key -> time.monotonic() when stored, for get(max_age=...)
+        self._stored_at: Dict[Hashable, float] = {}
+        # Keys being computed by get_or_compute -> set when done
+        self._pending: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None, max_age: Optional[float] = None) -> Any:
+        """
+        max_age: entries stored longer ago than this many seconds are dropped and count as a miss.
+        """
+        with self._lock:
+            if key in self._data and max_age is not None and time.monotonic() - self._stored_at[key] > max_age:
+                self._remove(key)
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        # Measured outside the lock, walking a large value takes a moment
+        size = estimate_size(value) if self.max_bytes else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                # Would push out everything else and still not fit
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self._stored_at[key] = time.monotonic()
+            self.bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        if key in self._data:
+            del self._data[key]
+            del self._stored_at[key]
+            self.bytes -= self._sizes.pop(key, 0)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], max_age: Optional[float] = None) -> Any:
+        """
+        Returns the cached value (not older than max_age seconds, see get) or computes and stores it.
+        compute() runs outside the lock;
+        callers asking for a key that is being computed wait for that result instead of
+        computing it again (e.g. a page render and the post-login warm-up).
+        If compute() raises, nothing is stored and the exception propagates: failures must
+        raise rather than return an empty value, which would be served until evicted.
+        """
+        sentinel = object()
+        while True:
+            value = self.get(key, sentinel, max_age)
+            if value is not sentinel:
+                return value
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+            # Not stored if compute() failed or the value was too large: compute it ourselves
+            value = self.get(key, sentinel)
+            if value is not sentinel:
+                return value
+            return compute()
+
+        try:
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """
+        Drops all entries, or only those whose key matches predicate.
+        """
+        with self._lock:
+            if predicate is None:
+                self._data.clear()
+                self._sizes.clear()
+                self._stored_at.clear()
+                self.bytes = 0
+            else:
+                for key in [k for k in self._data if predicate(k)]:
+                    self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# Reusable data of all sessions (readings, analytics results, AI contexts), see datasets.py.
+# Keys are tuples starting with the kind of data, e.g. ("readings", user_id, meter_type, data_version).
+shared_cache = LRUCache(max_entries=100_000, max_bytes=SHARED_CACHE_MAX_BYTES)
@@ -0,0 +1,83 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Number of most recent turns (user question + answer) sent verbatim
+KEEP_TURNS = 6
+# Older messages are folded into the summary in batches of at least this many messages
+SUMMARY_BATCH_MESSAGES = 4
+# Hard ceiling for the history part of a request (system prompt / data context not included)
+MAX_HISTORY_TOKENS = 6000
+CHARS_PER_TOKEN = 3.0
+
+# Shared by all sessions, summaries are short requests
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+def _estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+class ChatHistory:
+    """
+    Bounded view of the chat history (st.session_state.messages) for the LLM request.
+    The last KEEP_TURNS turns are sent verbatim, older turns are folded into a running
+    summary which the LLM writes in the background. Until a summary is ready, the older
+    messages are still sent verbatim, but never beyond MAX_HISTORY_TOKENS.
+    """
+    def __init__(self, llm_client, keep_turns: int = KEEP_TURNS, max_tokens: int = MAX_HISTORY_TOKENS):
+        self.llm_client = llm_client
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.reset()
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_count = 0  # Messages (from the start) contained in the summary
+        self._pending: Optional[Future] = None
+        self._pending_upto = 0
+
+    def _collect_summary(self):
+        if self._pending is None or not self._pending.done():
+            return
+        try:
+            self.summary = self._pending.result()
+            self.summarized_count = self._pending_upto
+        except Exception as e:
+            # Keep the old summary, the messages stay verbatim and are retried with the next turn
+            print(f"Error summarizing chat history: {e}")
+        self._pending = None
+
+    def _start_summary(self, messages: List[Dict[str, str]], upto: int):
+        self._pending_upto = upto
+        self._pending = _summary_pool.submit(
+            self.llm_client.summarize_history, self.summary, messages[self.summarized_count:upto]
+        )
+
+    def build(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Returns the messages to send for the next request (same format as st.session_state.messages).
+        """
+        if len(messages) < self.summarized_count:
+            # History was cleared ("Start new chat")
+            self.reset()
+        self._collect_summary()
+
+        # A turn starts with a user message
+        user_indices = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+        keep_from = user_indices[-self.keep_turns] if len(user_indices) > self.keep_turns else 0
+
+        if self._pending is None and keep_from - self.summarized_count >= SUMMARY_BATCH_MESSAGES:
+            self._start_summary(messages, keep_from)
+
+        window = list(messages[self.summarized_count:])
+        prefix = []
+        if self.summary:
+            prefix = [{"role": "user", "content": f"<conversation_summary>\n{self.summary}\n</conversation_summary>"}]
+
+        # Enforce the token ceiling: drop the oldest verbatim messages first, the newest one always stays
+        budget = self.max_tokens - sum(_estimate_tokens(m["content"]) for m in prefix)
+        while len(window) > 1 and sum(_estimate_tokens(m.get("content") or "") for m in window) > budget:
+            window.pop(0)
+        if window and _estimate_tokens(window[-1].get("content") or "") > budget:
+            max_chars = int(max(budget, 0) * CHARS_PER_TOKEN)
+            window[-1] = {**window[-1], "content": window[-1]["content"][:max_chars]}
+
+        return prefix + window
@@ -0,0 +1,129 @@
+import contextvars
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.data.db_handler import DBHandler
+from src.data.models import MeterReading
+from src.logic.analytics import calculate_monthly_consumption, calculate_yearly_stats
+from src.logic.cache import shared_cache
+from src.logic.profiling import profiled
+
+# Readings, meter config and analytics results, shared by all sessions through cache.shared_cache
+# and keyed by the data version of the user (meter list) or the meter (everything else): pages and the AI context reuse each other's results instead
+# of every session loading (and keeping) its own copy. Returned objects are shared, do not modify them.
+# Writers that do not bump the data versions (e.g. the Telegram bot on the same table) are picked up
+# when the entries are read again after CACHE_MAX_AGE_SECONDS.
+CACHE_MAX_AGE_SECONDS = 5 * 60
+
+# Post-login warm-up: loads the meters of a user in the background, several meters at once
+WARM_UP_WORKERS = 4
+_warm_up_pool = ThreadPoolExecutor(max_workers=WARM_UP_WORKERS, thread_name_prefix="warm-up")
+# Meters of a page render, loaded concurrently (see load_meters). Separate from the warm-up,
+# so a render never queues behind the warm-ups of other users.
+LOAD_WORKERS = 8
+_load_pool = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="meter-load")
+
+# A failed DB read raises through get_or_compute and is not cached: with strict=False the
+# caller gets an empty result for this rerun only, the next one reads again.
+
+def get_meter_types(db: DBHandler, user_id: str, strict: bool = False) -> List[str]:
+    version = db.get_data_version(user_id)
+    try:
+        return shared_cache.get_or_compute(("meter_types", str(user_id), version),
+                                           lambda: db.get_meter_types(user_id, strict=True), CACHE_MAX_AGE_SECONDS)
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Error getting meter types: {e}")
+        return []
+
+def get_readings(db: DBHandler, user_id: str, meter_type: str, strict: bool = False) -> List[MeterReading]:
+    version = db.get_data_version(user_id, meter_type)
+    try:
+        return shared_cache.get_or_compute(("readings", str(user_id), meter_type, version),
+                                           lambda: db.get_readings(user_id, meter_type, strict=True), CACHE_MAX_AGE_SECONDS)
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Error getting readings: {e}")
+        return []
+
+@profiled("analytics")
+def load_meter(db: DBHandler, user_id: str, meter_type: str) -> Dict[str, Any]:
+    """
+    Readings, config and monthly values of one meter.
+    Structure: {"unit", "mode", "readings", "df" (monthly, empty without enough data),
+    "key" (user_id, meter_type, data version and load time the values belong to)}
+    Raises on DB errors.
+    """
+    version = db.get_data_version(user_id, meter_type)
+
+    def build():
+        readings = get_readings(db, user_id, meter_type, strict=True)
+        config = db.get_meter_configs(user_id, meter_type, ['unit', 'eval_mode'], strict=True)
+        unit = config['unit'] or "Units"
+        eval_mode = config['eval_mode'] or 'difference'
+        return {
+            "unit": unit,
+            "mode": eval_mode,
+            "readings": readings,
+            "df": calculate_monthly_consumption(readings, eval_mode) if readings else pd.DataFrame(),
+            "key": (str(user_id), meter_type, version, time.time())
+        }
+
+    return shared_cache.get_or_compute(("meter", str(user_id), meter_type, version), build, CACHE_MAX_AGE_SECONDS)
+
+def yearly_stats(info: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Yearly statistics of a meter loaded by load_meter (all years).
+    """
+    # Computed lazily, as an entry of its own (the meter's entry is shared and already measured).
+    # The key includes the meter's load time, so a reloaded meter gets its stats computed again.
+    return shared_cache.get_or_compute(("yearly",) + info["key"],
+                                       lambda: calculate_yearly_stats(info["readings"], info["df"]))
+
+def _load_meter_with_stats(db: DBHandler, user_id: str, meter_type: str) -> Dict[str, Any]:
+    info = load_meter(db, user_id, meter_type)
+    yearly_stats(info)
+    return info
+
+def load_meters(db: DBHandler, user_id: str, meter_types: List[str]) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Loads the meters concurrently (load_meter plus yearly stats) and yields
+    (meter_type, info, error) in the order the loads complete.
+    """
+    # Create the client here: boto3 client creation is not thread-safe
+    db.dynamo
+    # Each load runs in a copy of the caller's context, so the rerun profile counts its DB calls and spans
+    futures = {_load_pool.submit(contextvars.copy_context().run, _load_meter_with_stats, db, user_id, m): m
+               for m in meter_types}
+    for future in as_completed(futures):
+        error = future.exception()
+        yield futures[future], None if error else future.result(), error
+
+def _warm_up_meter(db: DBHandler, user_id: str, meter_type: str):
+    try:
+        _load_meter_with_stats(db, user_id, meter_type)
+    except Exception as e:
+        print(f"Error warming up {meter_type}: {e}")
+
+def _warm_up(db: DBHandler, user_id: str):
+    try:
+        meter_types = get_meter_types(db, user_id, strict=True)
+    except Exception as e:
+        print(f"Error warming up meters: {e}")
+        return
+    for meter_type in meter_types:
+        _warm_up_pool.submit(_warm_up_meter, db, user_id, meter_type)
+
+def start_warm_up(db: DBHandler, user_id: str):
+    """
+    Loads the meter list and all meters (readings, config, monthly and yearly analytics) of a user
+    into the shared cache in the background, so the first dashboard after login is served warm.
+    Returns right away; a page asking for a meter still being loaded waits for that load
+    (LRUCache.get_or_compute) instead of starting its own.
+    """
+    # Create the client here: boto3 client creation is not thread-safe
+    db.dynamo
+    _warm_up_pool.submit(_warm_up, db, user_id)
@@ -0,0 +1,113 @@
+import io
+from dataclasses import dataclass, field
+from typing import List
+from PIL import Image, ImageOps, ImageSequence
+
+# Claude does not gain accuracy beyond ~1.15 megapixels (long edge 1568px),
+# larger images are downscaled server side anyway and only cost upload time and tokens.
+MAX_LONG_EDGE = 1568
+# Target size per encoded page (Bedrock rejects images above ~3.75 MB)
+MAX_BYTES_PER_IMAGE = 400_000
+JPEG_QUALITY_STEPS = [85, 75, 65, 55, 45]
+PDF_RENDER_DPI = 150
+MAX_PAGES = 10
+
+@dataclass
+class PreparedImages:
+    images: List[bytes] = field(default_factory=list)
+    media_type: str = "image/jpeg"
+    original_bytes: int = 0
+    processed_bytes: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(self.original_bytes - self.processed_bytes, 0)
+
+def _load_pages(data: bytes, media_type: str) -> List[Image.Image]:
+    """
+    Splits the upload into single page images.
+    PDFs are rendered with pypdfium2, multi-frame TIFFs are split frame by frame.
+    """
+    if media_type == "application/pdf" or data[:5] == b"%PDF-":
+        import pypdfium2 as pdfium  # Only needed for PDF uploads
+
+        pdf = pdfium.PdfDocument(data)
+        pages = []
+        for i in range(min(len(pdf), MAX_PAGES)):
+            pages.append(pdf[i].render(scale=PDF_RENDER_DPI / 72).to_pil())
+        return pages
+
+    img = Image.open(io.BytesIO(data))
+    pages = []
+    for frame in ImageSequence.Iterator(img):
+        pages.append(frame.copy())
+        if len(pages) >= MAX_PAGES:
+            break
+    return pages
+
+def _crop_to_content(img: Image.Image, margin_ratio: float = 0.02) -> Image.Image:
+    """
+    Crops uniform light borders (scanner bed, paper margin) around the content.
+    """
+    # Dark pixels (text, digits) become white in the mask
+    mask = ImageOps.autocontrast(img).point(lambda p: 255 if p < 128 else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return img
+
+    margin_x = int(img.width * margin_ratio)
+    margin_y = int(img.height * margin_ratio)
+    left = max(bbox[0] - margin_x, 0)
+    top = max(bbox[1] - margin_y, 0)
+    right = min(bbox[2] + margin_x, img.width)
+    bottom = min(bbox[3] + margin_y, img.height)
+
+    # Only crop if it actually removes something worth mentioning
+    if (right - left) * (bottom - top) > 0.9 * img.width * img.height:
+        return img
+    return img.crop((left, top, right, bottom))
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """
+    Composites transparent images (RGBA/LA, palette with transparency) onto white.
+    Grayscale conversion would drop the alpha channel and turn transparent areas black.
+    """
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        return Image.alpha_composite(Image.new("RGBA", rgba.size, (255, 255, 255, 255)), rgba).convert("RGB")
+    return img
+
+def _encode(img: Image.Image, max_bytes: int) -> bytes:
+    """
+    Encodes as JPEG, lowering quality and then resolution until the size budget is met.
+    """
+    while True:
+        for quality in JPEG_QUALITY_STEPS:
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality, optimize=True)
+            if buf.tell() <= max_bytes:
+                return buf.getvalue()
+        if max(img.size) <= 256:
+            # Give up shrinking, the smallest version is still fine for the model
+            return buf.getvalue()
+        img = img.resize((int(img.width * 0.8), int(img.height * 0.8)), Image.LANCZOS)
+
+def preprocess_image(data: bytes, media_type: str = "image/jpeg", max_bytes: int = MAX_BYTES_PER_IMAGE) -> PreparedImages:
+    """
+    Prepares an uploaded photo/scan for the Bedrock request:
+    auto-orient (EXIF), flatten transparency onto white, grayscale, crop to content, downsample to MAX_LONG_EDGE
+    and re-encode as JPEG within max_bytes. Multi-page PDFs/TIFFs yield one image per page.
+    """
+    result = PreparedImages(original_bytes=len(data))
+
+    for page in _load_pages(data, media_type):
+        page = ImageOps.exif_transpose(page)
+        page = ImageOps.grayscale(_flatten(page))
+        page = _crop_to_content(page)
+        page.thumbnail((MAX_LONG_EDGE, MAX_LONG_EDGE), Image.LANCZOS)
+
+        encoded = _encode(page, max_bytes)
+        result.images.append(encoded)
+        result.processed_bytes += len(encoded)
+
+    return result
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Job states are persisted here, so a rerun, page switch or browser refresh can resume polling
+JOBS_DIR = os.path.join(".cache", "jobs")
+MAX_WORKERS = 4
+# Finished jobs are removed after this time
+JOB_RETENTION_SECONDS = 24 * 3600
+
+class JobCancelled(Exception):
+    pass
+
+class JobContext:
+    """
+    Handed to the job function to report progress and to check for cancellation.
+    """
+    def __init__(self, runner: 'JobRunner', job_id: str):
+        self._runner = runner
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self._runner._is_cancelled(self.job_id)
+
+    def report(self, progress: float, message: str = ""):
+        """
+        progress: 0.0 - 1.0. Raises JobCancelled if the job was cancelled meanwhile.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        self._runner._update(self.job_id, progress=max(0.0, min(progress, 1.0)), message=message)
+
+class JobRunner:
+    """
+    Runs long AI work (imports, analyses) outside the Streamlit script thread.
+    submit() returns a job id, status()/cancel() work from any rerun or session of the same user.
+    Job functions take a JobContext and must return something JSON serializable.
+    """
+    def __init__(self, jobs_dir: str = JOBS_DIR, max_workers: int = MAX_WORKERS):
+        self.jobs_dir = jobs_dir
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        # Ids of active jobs (in _jobs) with a pending cancellation, removed with the job
+        self._cancelled = set()
+        self._cleanup()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: Dict[str, Any]):
+        # Write + rename, readers never see a half written file
+        tmp_path = self._path(job["id"]) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job["id"]))
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields, updated=time.time())
+            self._save(job)
+
+    def _is_cancelled(self, job_id: str) -> bool:
+        return job_id in self._cancelled
+
+    def _cleanup(self):
+        now = time.time()
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if now - os.path.getmtime(path) > JOB_RETENTION_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def submit(self, owner: str, kind: str, fn: Callable[[JobContext], Any]) -> str:
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "owner": str(owner),
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "message": "",
+            "result": None,
+            "error": None,
+            "created": time.time(),
+            "updated": time.time()
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+
+        def run():
+            if self._is_cancelled(job_id):
+                self._update(job_id, status="cancelled")
+                return
+            self._update(job_id, status="running")
+            try:
+                result = fn(JobContext(self, job_id))
+                if self._is_cancelled(job_id):
+                    self._update(job_id, status="cancelled")
+                else:
+                    self._update(job_id, status="done", progress=1.0, result=result)
+            except JobCancelled:
+                self._update(job_id, status="cancelled")
+            except Exception as e:
+                print(f"Error in job {kind} {job_id}: {e}")
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                with self._lock:
+                    self._futures.pop(job_id, None)
+                    # Finished jobs are served from disk from now on
+                    self._jobs.pop(job_id, None)
+                    self._cancelled.discard(job_id)
+
+        with self._lock:
+            self._futures[job_id] = self._pool.submit(run)
+        return job_id
+
+    def status(self, job_id: str, owner: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the job (id, status, progress, message, result, error) or None if unknown
+        or owned by someone else. status: queued | running | done | failed | cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job = dict(job)
+        if job is None:
+            try:
+                with open(self._path(job_id), encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                return None
+        if job.get("owner") != str(owner):
+            return None
+        return job
+
+    def cancel(self, job_id: str, owner: str) -> bool:
+        job = self.status(job_id, owner)
+        if job is None or job["status"] not in ("queued", "running"):
+            return False
+        with self._lock:
+            if job_id not in self._jobs:
+                # Finished meanwhile
+                return False
+            self._cancelled.add(job_id)
+            future = self._futures.get(job_id)
+        # Not started yet -> drop it right away, running jobs stop at their next report()
+        if future is not None and future.cancel():
+            self._update(job_id, status="cancelled")
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._jobs.pop(job_id, None)
+                self._cancelled.discard(job_id)
+        return True
+
+    def discard(self, job_id: str, owner: str):
+        """
+        Removes a finished job once its result has been taken over.
+        """
+        if self.status(job_id, owner) is None:
+            return
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+_job_runner: Optional[JobRunner] = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """
+    Process-wide instance, shared by all sessions.
+    """
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
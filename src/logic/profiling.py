@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from src.data.metrics import READ_OPERATIONS
+
+# Chrome trace event format ("JSON Array Format" without closing bracket, so it can be appended to).
+# Open in https://ui.perfetto.dev or chrome://tracing
+TRACE_PATH = os.path.join(".cache", "traces", "trace.json")
+
+_trace_lock = threading.Lock()
+# Process start, trace timestamps are relative to it
+_t0_ns = time.perf_counter_ns()
+
+class RerunProfile:
+    """
+    Spans and DynamoDB statistics of one script rerun.
+    Thread-safe: work the rerun hands to worker threads with its context (see datasets.load_meters)
+    records into the same profile.
+    """
+    def __init__(self, session_id: str, label: str = ""):
+        self.session_id = session_id
+        self.label = label
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.thread_name = threading.current_thread().name  # The script thread
+        self.spans: List[Dict[str, Any]] = []
+        self.db_round_trips = 0
+        self.db_read_units = 0.0
+        self.db_write_units = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def total_ms(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e6
+
+    def add_span(self, name: str, category: str, start_ns: int, end_ns: int, args: Optional[Dict[str, Any]] = None):
+        span = {
+            "name": name,
+            "category": category,
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "depth": _depth.get(),
+            "thread": threading.current_thread().name,
+            "args": args or {}
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def add_db_call(self, round_trips: int, read_units: float, write_units: float):
+        with self._lock:
+            self.db_round_trips += round_trips
+            self.db_read_units += read_units
+            self.db_write_units += write_units
+
+    def spans_snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.spans)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Spans aggregated by name, slowest first: name, category, calls, total_ms, max_ms.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans_snapshot():
+            duration = (span["end_ns"] - span["start_ns"]) / 1e6
+            row = rows.setdefault(span["name"], {"name": span["name"], "category": span["category"],
+                                                 "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["calls"] += 1
+            row["total_ms"] += duration
+            row["max_ms"] = max(row["max_ms"], duration)
+        return sorted(rows.values(), key=lambda r: r["total_ms"], reverse=True)
+
+# Profile of the rerun running in the current script thread (None = profiling off, spans are no-ops).
+# Worker threads (jobs, summaries) do not inherit it and are not traced, unless the work is
+# submitted with the rerun's context (contextvars.copy_context().run).
+_current: contextvars.ContextVar[Optional[RerunProfile]] = contextvars.ContextVar("rerun_profile", default=None)
+# Nesting level of the open spans, per thread/context
+_depth: contextvars.ContextVar[int] = contextvars.ContextVar("span_depth", default=0)
+
+def current_profile() -> Optional[RerunProfile]:
+    return _current.get()
+
+def start_rerun(session_id: str, label: str = "") -> RerunProfile:
+    profile = RerunProfile(session_id, label)
+    _current.set(profile)
+    return profile
+
+def finish_rerun(label: Optional[str] = None, trace_path: str = TRACE_PATH) -> Optional[RerunProfile]:
+    """
+    Ends the current rerun profile and appends its spans to the trace log.
+    """
+    profile = _current.get()
+    if profile is None:
+        return None
+    _current.set(None)
+    if label:
+        profile.label = label
+    profile.end_ns = time.perf_counter_ns()
+    write_trace(profile, trace_path)
+    return profile
+
+@contextmanager
+def span(name: str, category: str = "app", **args):
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start_ns = time.perf_counter_ns()
+    token = _depth.set(_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _depth.reset(token)
+        profile.add_span(name, category, start_ns, time.perf_counter_ns(), args)
+
+def record_span(name: str, category: str, start_ns: int, **args):
+    """
+    Records a span that ends now (for code that cannot be wrapped in a with block, e.g. generators).
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.add_span(name, category, start_ns, time.perf_counter_ns(), args)
+
+def profiled(category: str, name: Optional[str] = None):
+    """
+    Decorator: wraps every call of the function in a span.
+    """
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def profile_methods(category: str):
+    """
+    Class decorator: applies profiled() to all public methods.
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and callable(value) and not isinstance(value, (staticmethod, classmethod)):
+                setattr(cls, attr, profiled(category)(value))
+        return cls
+    return decorator
+
+def _record_dynamo_response(http_response, parsed, model, **kwargs):
+    profile = _current.get()
+    if profile is None:
+        return
+    capacities = parsed.get("ConsumedCapacity") or []
+    if isinstance(capacities, dict):
+        capacities = [capacities]
+    # Requested by the DynamoDB metrics hooks (ReturnConsumedCapacity=TOTAL)
+    units = sum(capacity.get("CapacityUnits", 0.0) or 0.0 for capacity in capacities)
+    read = model.name in READ_OPERATIONS
+    # One round trip per attempt, retries included
+    profile.add_db_call(1 + parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+                        units if read else 0.0, 0.0 if read else units)
+
+def instrument_dynamo_client(client):
+    """
+    Counts round trips (incl. retries) and consumed capacity of a boto3 DynamoDB client
+    for the current rerun profile.
+    """
+    client.meta.events.register("after-call.dynamodb.*", _record_dynamo_response, unique_id="profiling-after-call")
+    return client
+
+def write_trace(profile: RerunProfile, trace_path: str = TRACE_PATH):
+    pid = os.getpid()
+    tid = profile.session_id[:8]
+    events = [{
+        "name": profile.label or "rerun", "cat": "rerun", "ph": "X", "pid": pid, "tid": tid,
+        "ts": (profile.start_ns - _t0_ns) / 1000, "dur": (profile.end_ns - profile.start_ns) / 1000,
+        "args": {"db_round_trips": profile.db_round_trips, "db_read_units": profile.db_read_units,
+                 "db_write_units": profile.db_write_units}
+    }]
+    for s in profile.spans_snapshot():
+        # Spans of worker threads overlap the script thread's, each thread gets its own track
+        span_tid = tid if s["thread"] == profile.thread_name else f"{tid} {s['thread']}"
+        events.append({
+            "name": s["name"], "cat": s["category"], "ph": "X", "pid": pid, "tid": span_tid,
+            "ts": (s["start_ns"] - _t0_ns) / 1000, "dur": (s["end_ns"] - s["start_ns"]) / 1000,
+            "args": s["args"]
+        })
+    try:
+        with _trace_lock:
+            os.makedirs(os.path.dirname(trace_path), exist_ok=True)
+            new_file = not os.path.exists(trace_path)
+            with open(trace_path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write("[\n")
+                for event in events:
+                    f.write(json.dumps(event, default=str) + ",\n")
+    except OSError as e:
+        print(f"Error writing trace: {e}")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from src.data.db_handler import DBHandler
+from src.data.models import MeterReading
+from src.logic.datasets import get_readings
+from src.logic.profiling import profiled
+
+# Status of an import row compared to the stored readings
+NEW = "new"                  # No reading of the meter on that date
+CHANGED = "changed"          # Reading exists with a different value
+IDENTICAL = "identical"      # Reading exists with the same value, not written again
+CONFLICTING = "conflicting"  # The import has different values for the same meter and date, not written
+INVALID = "invalid"          # Meter, date or value missing or unreadable, not written
+STATUSES = [NEW, CHANGED, CONFLICTING, INVALID, IDENTICAL]
+WRITE_STATUSES = (NEW, CHANGED)
+
+# Values closer than this are the same reading (float noise of the AI output / JSON round trip)
+VALUE_TOLERANCE = 1e-9
+
+@profiled("analytics")
+def reconcile_import(db: DBHandler, user_id: str, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classifies import rows (columns meter_type, date, value) against the stored readings,
+    which are loaded once per affected meter (shared cache).
+    Returns the rows normalized (date YYYY-MM-DD, value float) in their original order,
+    with the columns status (see STATUSES) and existing_value.
+    """
+    rows = rows.reindex(columns=["meter_type", "date", "value"])
+    result = pd.DataFrame({
+        "meter_type": rows["meter_type"].fillna("").astype(str).str.strip(),
+        "date": pd.to_datetime(rows["date"].astype(str), format="ISO8601", errors="coerce").dt.strftime("%Y-%m-%d"),
+        "value": pd.to_numeric(rows["value"], errors="coerce")
+    }).reset_index(drop=True)
+    valid = result["date"].notna() & result["value"].notna() & (result["meter_type"] != "")
+
+    existing: List[pd.DataFrame] = []
+    for meter_type in result.loc[valid, "meter_type"].unique():
+        readings = get_readings(db, user_id, meter_type)
+        existing.append(pd.DataFrame({
+            "meter_type": meter_type,
+            "date": [r.reading_date for r in readings],
+            "existing_value": [r.meter_reading for r in readings]
+        }))
+    existing_df = pd.concat(existing, ignore_index=True) if existing else pd.DataFrame(columns=["meter_type", "date", "existing_value"])
+    result = result.merge(existing_df.astype({"existing_value": float}), on=["meter_type", "date"], how="left")
+
+    # Several rows for one meter and date: fine if they agree, a conflict otherwise
+    values = result["value"].where(valid)
+    groups = values.groupby([result["meter_type"], result["date"]])
+    conflicting = valid & ((groups.transform("max") - groups.transform("min")) > VALUE_TOLERANCE)
+    same = np.isclose(result["value"], result["existing_value"], rtol=0, atol=VALUE_TOLERANCE)
+
+    result["status"] = np.select(
+        [~valid, conflicting, result["existing_value"].isna(), same],
+        [INVALID, CONFLICTING, NEW, IDENTICAL],
+        default=CHANGED
+    )
+    return result
+
+def summarize(classified: pd.DataFrame) -> Dict[str, int]:
+    """
+    Row count per status (all STATUSES, also zero).
+    """
+    counts = classified["status"].value_counts()
+    return {status: int(counts.get(status, 0)) for status in STATUSES}
+
+def readings_to_write(classified: pd.DataFrame) -> List[MeterReading]:
+    """
+    The new and changed readings of a reconciled import, one per meter and date.
+    """
+    rows = classified[classified["status"].isin(WRITE_STATUSES)].drop_duplicates(["meter_type", "date"])
+    return [MeterReading(meter_type=m, meter_reading=float(v), reading_date=d)
+            for m, d, v in zip(rows["meter_type"], rows["date"], rows["value"])]
@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+import streamlit as st
+
+from src.data.models import User
+
+# bcrypt releases the GIL while hashing, so a small thread pool keeps logins off the script thread
+# and bounds the number of cores they can occupy
+PASSWORD_WORKERS = max(1, min(2, (os.cpu_count() or 1) - 1))
+# Logins waiting for a worker beyond this are rejected right away instead of queueing up
+MAX_PENDING_PASSWORD_CHECKS = 16
+PASSWORD_CHECK_TIMEOUT_SECONDS = 10
+# Session tokens are kept in a browser cookie (see auth.py), they expire after a day and are
+# revoked on logout through the user's session generation
+SESSION_TTL_SECONDS = 24 * 3600
+# Open sessions re-check their token's generation against the user item this often
+SESSION_RECHECK_SECONDS = 5 * 60
+
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(MAX_PENDING_PASSWORD_CHECKS)
+
+# Login statistics are written in the background, the login does not wait for them
+_stats_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="login-stats")
+
+# Used when no SESSION_SECRET is configured: tokens are then only valid until the app restarts
+_fallback_secret = secrets.token_bytes(32)
+
+class PasswordCheckBusy(RuntimeError):
+    pass
+
+def _run_bcrypt(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordCheckBusy("Too many concurrent password checks")
+    try:
+        future = _password_pool.submit(fn, *args)
+    except Exception:
+        _password_slots.release()
+        raise
+    # The slot is freed when the hash is done, not when the caller gives up waiting
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future.result(timeout=PASSWORD_CHECK_TIMEOUT_SECONDS)
+
+def hash_password(password: str) -> str:
+    import bcrypt
+    return _run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def check_password(password: str, hashed: str) -> Optional[bool]:
+    """
+    Returns None if the check could not run (pool busy, timeout), so callers can
+    tell "wrong password" apart from "try again". A malformed stored hash is a failed login.
+    """
+    import bcrypt
+    try:
+        return _run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+    except (PasswordCheckBusy, FutureTimeoutError) as e:
+        print(f"Password check busy: {e!r}")
+        return None
+    except ValueError as e:
+        print(f"Error checking password: {e}")
+        return False
+
+def update_user_stats_async(db, username: str):
+    _stats_pool.submit(db.update_user_stats, username)
+
+def _session_secret() -> bytes:
+    secret = None
+    if hasattr(st, "secrets") and "SESSION_SECRET" in st.secrets:
+        secret = st.secrets["SESSION_SECRET"]
+    secret = secret or os.environ.get("SESSION_SECRET")
+    return secret.encode('utf-8') if secret else _fallback_secret
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def issue_session_token(user: User, ttl_seconds: int = SESSION_TTL_SECONDS) -> str:
+    """
+    Signed (HMAC-SHA256), expiring token carrying the user. Bound to the user's session
+    generation: restore_session callers compare it with the user item (see auth.py).
+    """
+    payload = {
+        "u": user.username,
+        "i": user.user_id,
+        "c": user.created_at,
+        "q": user.ai_quota_used,
+        "m": user.quota_month,
+        "g": user.session_generation,
+        "exp": int(time.time()) + ttl_seconds
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode('utf-8'))
+    signature = _b64encode(hmac.new(_session_secret(), body.encode('ascii'), hashlib.sha256).digest())
+    return f"{body}.{signature}"
+
+def restore_session(token: str) -> Optional[User]:
+    """
+    Returns the user of a valid, unexpired token, otherwise None.
+    Does not check revocation (session_generation against the user item).
+    """
+    try:
+        body, signature = token.split(".", 1)
+        expected = _b64encode(hmac.new(_session_secret(), body.encode('ascii'), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        payload = json.loads(_b64decode(body))
+        if payload["exp"] < time.time():
+            return None
+        return User(
+            username=payload["u"],
+            user_id=payload["i"],
+            password_hash="",
+            created_at=payload.get("c", ""),
+            ai_quota_used=payload.get("q", 0),
+            quota_month=payload.get("m", ""),
+            session_generation=payload.get("g", 0)
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Aggregates are written here every EXPORT_INTERVAL_SECONDS (on the next recorded call)
+EXPORT_PATH = os.path.join(".cache", "llm_telemetry.json")
+EXPORT_INTERVAL_SECONDS = 60
+# Latency samples kept per aggregate for percentiles
+MAX_SAMPLES = 500
+
+# Claude Sonnet 4.5 on Bedrock, USD per million tokens (estimate only)
+PRICE_INPUT = 3.00
+PRICE_OUTPUT = 15.00
+PRICE_CACHE_READ = 0.30
+PRICE_CACHE_WRITE = 3.75
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+class _Aggregate:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        # Newest samples win
+        self.wall_ms = deque(maxlen=MAX_SAMPLES)
+        self.ttft_ms = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, call: Dict[str, Any]):
+        self.calls += 1
+        self.errors += 1 if call.get("error") else 0
+        self.input_tokens += call.get("input_tokens", 0)
+        self.output_tokens += call.get("output_tokens", 0)
+        self.cache_read_tokens += call.get("cache_read_tokens", 0)
+        self.cache_write_tokens += call.get("cache_write_tokens", 0)
+        self.request_bytes += call.get("request_bytes", 0)
+        self.response_bytes += call.get("response_bytes", 0)
+        self.wall_ms.append(call["wall_ms"])
+        if call.get("ttft_ms") is not None:
+            self.ttft_ms.append(call["ttft_ms"])
+
+    def summary(self) -> Dict[str, Any]:
+        cost = (self.input_tokens * PRICE_INPUT + self.output_tokens * PRICE_OUTPUT
+                + self.cache_read_tokens * PRICE_CACHE_READ + self.cache_write_tokens * PRICE_CACHE_WRITE) / 1_000_000
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wall_ms_p50": _percentile(self.wall_ms, 50),
+            "wall_ms_p95": _percentile(self.wall_ms, 95),
+            "ttft_ms_p50": _percentile(self.ttft_ms, 50),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "cost_usd": round(cost, 4)
+        }
+
+class LLMTelemetry:
+    """
+    In-memory aggregates of all model invocations of this process, per user and feature
+    (feature = chat, smart_import, chat_summary, ...).
+    """
+    def __init__(self, export_path: str = EXPORT_PATH, export_interval: float = EXPORT_INTERVAL_SECONDS):
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        self._by_user_feature: Dict[tuple, _Aggregate] = {}
+        self._by_feature: Dict[str, _Aggregate] = {}
+        self._last_export = time.time()
+
+    def record(self, feature: str, user: Optional[str], wall_ms: float, ttft_ms: Optional[float] = None,
+               usage: Optional[Dict[str, Any]] = None, request_bytes: int = 0, response_bytes: int = 0,
+               error: Optional[str] = None):
+        usage = usage or {}
+        call = {
+            "wall_ms": wall_ms,
+            "ttft_ms": ttft_ms,
+            "input_tokens": usage.get("input_tokens", 0) or 0,
+            "output_tokens": usage.get("output_tokens", 0) or 0,
+            "cache_read_tokens": usage.get("cache_read_input_tokens", 0) or 0,
+            "cache_write_tokens": usage.get("cache_creation_input_tokens", 0) or 0,
+            "request_bytes": request_bytes,
+            "response_bytes": response_bytes,
+            "error": error
+        }
+        with self._lock:
+            self._by_user_feature.setdefault((user or "-", feature), _Aggregate()).add(call)
+            self._by_feature.setdefault(feature, _Aggregate()).add(call)
+            export_due = time.time() - self._last_export >= self.export_interval
+            if export_due:
+                self._last_export = time.time()
+        if export_due:
+            self.export()
+
+    def user_summary(self, user: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {feature: agg.summary() for (u, feature), agg in self._by_user_feature.items() if u == user}
+
+    def feature_summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {feature: agg.summary() for feature, agg in self._by_feature.items()}
+
+    def export(self):
+        """
+        Writes the current aggregates as JSON (overwrites the previous export).
+        """
+        with self._lock:
+            snapshot = {
+                "exported_at": time.time(),
+                "features": {f: agg.summary() for f, agg in self._by_feature.items()},
+                "users": {f"{u}/{f}": agg.summary() for (u, f), agg in self._by_user_feature.items()}
+            }
+        try:
+            if os.path.dirname(self.export_path):
+                os.makedirs(os.path.dirname(self.export_path), exist_ok=True)
+            tmp_path = self.export_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.export_path)
+        except OSError as e:
+            print(f"Error exporting LLM telemetry: {e}")
+
+# Process-wide registry, shared by all sessions
+telemetry = LLMTelemetry()
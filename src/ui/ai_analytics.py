@@ -1,13 +1,14 @@
 import streamlit as st
 from datetime import datetime
 from src.data.db_handler import DBHandler
-from src.data.models import User
+from src.data.models import User, QUOTA_LIMIT
 from src.logic.llm_client import LLMClient
-from src.logic.analytics import calculate_monthly_consumption
+from src.logic.ai_context import get_data_context, load_dataset
+from src.logic.analytics_tools import ANALYTICS_TOOLS, run_analytics_tool
+from src.logic.chat_history import ChatHistory
+from src.logic.response_cache import ResponseCache, get_response_cache
 from src.ui.i18n import t
 
-QUOTA_LIMIT = 50  # Hard limit per user per month
-
 def ai_analytics_page(db: DBHandler, user: User):
     st.header(t("🤖 Talk to your Data"))
     st.caption(t("Analyze your monthly data with AI support (Powered by AWS Bedrock / Claude 3.5 Sonnet)"))
@@ -15,9 +16,9 @@ def ai_analytics_page(db: DBHandler, user: User):
     # --- Quota Check ---
     current_month_str = datetime.now().strftime("%Y-%m")
     
-    # Check if we need to reset quota view for new month logic
+    # Display only (session copy may be stale), the real check is the atomic reservation per request
     if user.quota_month != current_month_str:
-        user_quota_used = 0 # Will be reset in DB on next write
+        user_quota_used = 0 # New month, the DB counter starts at 0 on its own
     else:
         user_quota_used = user.ai_quota_used
         
@@ -32,6 +33,8 @@ def ai_analytics_page(db: DBHandler, user: User):
     # Reset Button
     if st.button(t("🗑️ Start new chat"), type="secondary", help=t("Clears the current chat history")):
         st.session_state.messages = []
+        if "chat_history" in st.session_state:
+            st.session_state.chat_history.reset()
         st.rerun()
 
     # Initialize chat history
@@ -46,7 +49,11 @@ def ai_analytics_page(db: DBHandler, user: User):
     # Initialize LLM Client (cached to avoid re-init per rerun)
     if "llm_client" not in st.session_state:
         # You might want to let the user configure the region in settings, but for now we default here
-        st.session_state.llm_client = LLMClient(region_name="eu-central-1")
+        st.session_state.llm_client = LLMClient(region_name="eu-central-1", user_id=user.username)
+
+    # Bounded history (recent turns verbatim, older ones summarized in the background)
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = ChatHistory(st.session_state.llm_client)
 
     # Display chat messages from history on app rerun
     for message in st.session_state.messages:
@@ -66,54 +73,77 @@ def ai_analytics_page(db: DBHandler, user: User):
             message_placeholder.markdown(t("⏳ *Analyzing data...*"))
             
             try:
-                # 1. Fetch Data
-                # We fetch fresh data every time to ensure accuracy
-                meter_types = db.get_meter_types(user.user_id)
-                data_summary = {}
+                # 1. Fetch Data (memoized per data version, rebuilt only after a write)
+                data_context = get_data_context(db, user.user_id, st.session_state.llm_client)
                 
-                if not meter_types:
+                if not data_context.meter_count:
                     response_text = t("Unfortunately, I cannot find any meter data in your profile. Please add data in the dashboard first.")
                 else:
-                    for mt in meter_types:
-                        readings = db.get_readings(user.user_id, mt)
-                        if not readings:
-                            continue
-
-                        unit = db.get_meter_config(user.user_id, mt, 'unit') or "Units"
-                        eval_mode = db.get_meter_config(user.user_id, mt, 'eval_mode') or 'difference'
-                        
-                        # Calculate monthly stats to give LLM the processed "intelligence"
-                        monthly_df = calculate_monthly_consumption(readings, eval_mode)
-                        
-                        if not monthly_df.empty:
-                            data_summary[mt] = {
-                                "unit": unit,
-                                "mode": eval_mode,
-                                "df": monthly_df
-                            }
-                    
-                    if not data_summary:
+                    if not data_context.text:
                         st.warning(t("Insufficient data available for analysis."))
                         st.stop()
                     
-                    # 2. Format Data
-                    context_data = st.session_state.llm_client.format_readings(data_summary)
-                    
-                    # 3. Call LLM with History
-                    # We pass the full session history (excluding the first greeting if role is assistant and it was hardcoded, 
-                    # but here we just pass everything. The LLM handles role 'assistant' correctly as past context.)
-                    response_text = st.session_state.llm_client.query(st.session_state.messages, context_data)
+                    # 2. Format Data (already limited to the context token budget)
+                    # Large accounts only send an overview and let the model query details via tools
+                    tools, tool_handler = None, None
+                    context_data = data_context.text
+                    if data_context.use_tools:
+                        dataset = load_dataset(db, user.user_id)
+                        tools = ANALYTICS_TOOLS
+                        tool_handler = lambda name, tool_input: run_analytics_tool(dataset, name, tool_input)
+                    st.caption(t("Data context: {} tokens ({})", data_context.token_count, data_context.layout))
                     
-                    # 4. Update Quota
-                    if "Es ist ein Fehler" not in response_text and "Zugriff verweigert" not in response_text:
-                        if user.quota_month != current_month_str:
-                            db.reset_ai_quota(user.username, current_month_str)
-                            # Update local session object immediately
-                            user.quota_month = current_month_str
-                            user.ai_quota_used = 1
-                        else:
-                            db.increment_ai_quota(user.username, current_month_str)
-                            user.ai_quota_used += 1
+                    # 3. Answer from cache if the same first question was asked on the same data.
+                    # Only without prior turns, otherwise the history could change the answer.
+                    cache_key, cached_text = None, None
+                    if sum(1 for m in st.session_state.messages if m["role"] == "user") == 1:
+                        cache_key = ResponseCache.make_key(prompt, data_context.data_hash,
+                                                           st.session_state.llm_client.model_id,
+                                                           st.session_state.get('language', 'en'))
+                        cached_text = get_response_cache().get(cache_key)
+
+                    if cached_text is not None:
+                        # Instant answer, does not consume quota
+                        response_text = cached_text
+                        st.caption(t("⚡ Answer from cache (no quota used)"))
+                    else:
+                        # 4. Reserve quota (atomic check + increment, safe across tabs/sessions)
+                        try:
+                            new_count = db.reserve_ai_quota(user.username, current_month_str, QUOTA_LIMIT)
+                        except Exception as e:
+                            print(f"Error reserving quota: {e}")
+                            message_placeholder.error(t("The AI is not available right now, please try again in a moment."))
+                            st.stop()
+                        if new_count is None:
+                            message_placeholder.error(t("You have reached your monthly limit of {} requests. Come back next month!", QUOTA_LIMIT))
+                            st.stop()
+                        # Update local session object immediately
+                        user.quota_month = current_month_str
+                        user.ai_quota_used = new_count
+
+                        # 5. Call LLM with History (streaming)
+                        # Only the recent turns are passed verbatim, older ones as summary (hard token ceiling).
+                        # The greeting is skipped by the client (first message must be 'user').
+                        history = st.session_state.chat_history.build(st.session_state.messages)
+                        response_text = ""
+                        try:
+                            # Render the answer incrementally as the deltas arrive
+                            for delta in st.session_state.llm_client.query_stream(history, context_data, tools, tool_handler):
+                                response_text += delta
+                                message_placeholder.markdown(response_text + "▌")
+                        except Exception:
+                            # Failed requests do not count
+                            refunded = db.refund_ai_quota(user.username, current_month_str)
+                            if refunded is not None:
+                                user.ai_quota_used = refunded
+                            raise
+                        
+                        if "Es ist ein Fehler" in response_text or "Zugriff verweigert" in response_text:
+                            refunded = db.refund_ai_quota(user.username, current_month_str)
+                            if refunded is not None:
+                                user.ai_quota_used = refunded
+                        elif cache_key:
+                            get_response_cache().set(cache_key, response_text)
 
                 # Show result
                 message_placeholder.markdown(response_text)
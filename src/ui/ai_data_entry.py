@@ -2,17 +2,78 @@ import streamlit as st
 import json
 import pandas as pd
 from src.data.db_handler import DBHandler
-from src.data.models import User, MeterReading
+from src.data.models import User
 from src.logic.llm_client import LLMClient
+from src.logic.image_preprocessing import preprocess_image
+from src.logic.jobs import JobContext, get_job_runner
+from src.logic.reconciliation import CONFLICTING, IDENTICAL, STATUSES, readings_to_write, reconcile_import, summarize
 from src.ui.i18n import t
 
+def _clear_import_job():
+    st.session_state.pop("import_job_id", None)
+    if "import_job" in st.query_params:
+        del st.query_params["import_job"]
+
+@st.fragment(run_every=1.0)
+def _import_job_status(job_id: str, user: User):
+    """
+    Polls the background import job. Only this fragment reruns while the job is running.
+    """
+    runner = get_job_runner()
+    job = runner.status(job_id, user.user_id)
+    
+    if job is None:
+        _clear_import_job()
+        return
+
+    if job["status"] in ("queued", "running"):
+        text = t("Analyzing data...") + (f" ({job['message']})" if job["message"] else "")
+        st.progress(job["progress"], text=text)
+        if st.button(t("Cancel analysis"), key="cancel_import_job"):
+            runner.cancel(job_id, user.user_id)
+        return
+
+    # Finished: hand the outcome to the full page run
+    _clear_import_job()
+    runner.discard(job_id, user.user_id)
+    st.session_state.import_job_result = job
+    st.rerun()
+
+def _show_import_result(job: dict):
+    if job["status"] == "cancelled":
+        st.info(t("Analysis cancelled."))
+        return
+    if job["status"] == "failed":
+        st.error(t("AI Error: {}", job["error"]))
+        return
+
+    json_str = job["result"]["json"]
+    stats = job["result"].get("stats", {})
+    if stats.get("failed_chunks"):
+        st.warning(t("{} of {} parts could not be read by the AI and were skipped.", stats["failed_chunks"], stats["chunks"]))
+    
+    try:
+        data = json.loads(json_str)
+        
+        # Check for explicit error from backend
+        if isinstance(data, dict) and "error" in data:
+            st.error(t("AI Error: {}", data['error']))
+        elif not data:
+            st.error(t("Could not find valid data."))
+        else:
+            st.session_state.import_preview_data = data
+            st.success(t("{} records found!", len(data)))
+            
+    except json.JSONDecodeError:
+        st.error(t("Error processing response: {}...", json_str[:100]))
+
 def ai_data_entry_page(db: DBHandler, user: User):
     st.header(t("🤖 AI Data Import"))
     st.caption(t("Paste chaotic data simply via Copy & Paste. The AI structures it for you."))
 
     # Initialize LLM
     if "llm_client" not in st.session_state:
-        st.session_state.llm_client = LLMClient(region_name="eu-central-1")
+        st.session_state.llm_client = LLMClient(region_name="eu-central-1", user_id=user.username)
 
     col1, col2 = st.columns(2)
     
@@ -23,43 +84,56 @@ def ai_data_entry_page(db: DBHandler, user: User):
     
     with col2:
         # Input Area - Image
-        uploaded_file = st.file_uploader(t("Or upload an image (Photo, Scan)"), type=['png', 'jpg', 'jpeg'])
+        uploaded_file = st.file_uploader(t("Or upload an image (Photo, Scan)"), type=['png', 'jpg', 'jpeg', 'webp', 'tif', 'tiff', 'pdf'])
 
     if st.button(t("Start AI Analysis"), type="primary"):
         if not raw_text.strip() and not uploaded_file:
             st.warning(t("Please enter text or upload an image."))
         else:
-            with st.spinner(t("Analyzing data...")):
-                meter_types = db.get_meter_types(user.user_id)
-                
-                image_bytes = None
-                media_type = "image/jpeg"
-                
-                if uploaded_file:
-                    image_bytes = uploaded_file.getvalue()
-                    media_type = uploaded_file.type
-                
-                json_str = st.session_state.llm_client.parse_smart_import(
+            meter_types = db.get_meter_types(user.user_id)
+            
+            images = []
+            media_type = "image/jpeg"
+            
+            if uploaded_file:
+                # Shrink photos/scans before upload (orientation, crop, resolution, grayscale)
+                try:
+                    prepared = preprocess_image(uploaded_file.getvalue(), uploaded_file.type)
+                except Exception as e:
+                    # Corrupt/truncated files, undecodable PDFs, decompression bombs
+                    st.error(t("The file could not be read as an image: {}", e))
+                    st.stop()
+                images = prepared.images
+                media_type = prepared.media_type
+                st.caption(t("Image optimized: {} KB → {} KB ({} KB saved, {} page(s))",
+                             prepared.original_bytes // 1024, prepared.processed_bytes // 1024,
+                             prepared.bytes_saved // 1024, len(images)))
+            
+            llm_client = st.session_state.llm_client
+
+            def run_import(ctx: JobContext) -> dict:
+                json_str = llm_client.parse_smart_import(
                     raw_text, 
                     meter_types, 
-                    image_data=image_bytes, 
-                    media_type=media_type
+                    media_type=media_type,
+                    images=images,
+                    progress_callback=lambda done, total: ctx.report(done / total, f"{done}/{total}")
                 )
-                
-                try:
-                    data = json.loads(json_str)
-                    
-                    # Check for explicit error from backend
-                    if isinstance(data, dict) and "error" in data:
-                        st.error(t("AI Error: {}", data['error']))
-                    elif not data:
-                        st.error(t("Could not find valid data."))
-                    else:
-                        st.session_state.import_preview_data = data
-                        st.success(t("{} records found!", len(data)))
-                        
-                except json.JSONDecodeError:
-                    st.error(t("Error processing response: {}...", json_str[:100]))
+                return {"json": json_str, "stats": getattr(llm_client, "last_import_stats", {})}
+
+            # Runs in the background: the page stays responsive and the job survives navigation
+            job_id = get_job_runner().submit(user.user_id, "smart_import", run_import)
+            st.session_state.import_job_id = job_id
+            st.query_params["import_job"] = job_id
+
+    # Resume a running import (also after a page switch or browser refresh)
+    job_id = st.session_state.get("import_job_id") or st.query_params.get("import_job")
+    if job_id:
+        _import_job_status(job_id, user)
+
+    # Show the result of a finished import once
+    if "import_job_result" in st.session_state:
+        _show_import_result(st.session_state.pop("import_job_result"))
 
     # Preview & Save Area
     if "import_preview_data" in st.session_state and st.session_state.import_preview_data:
@@ -70,26 +144,41 @@ def ai_data_entry_page(db: DBHandler, user: User):
         df = pd.DataFrame(st.session_state.import_preview_data)
         edited_df = st.data_editor(df, num_rows="dynamic", use_container_width=True)
         
+        # Compared with the stored readings: only new and changed rows are written
+        classified = reconcile_import(db, user.user_id, edited_df)
+        counts = summarize(classified)
+        for col, status in zip(st.columns(len(STATUSES)), STATUSES):
+            col.metric(t(status.capitalize()), counts[status])
+        if counts[CONFLICTING]:
+            st.warning(t("Rows with different values for the same meter and date are not saved. Correct them in the table above."))
+
+        pending = classified[classified["status"] != IDENTICAL]
+        if not pending.empty:
+            st.dataframe(
+                pending.assign(status=pending["status"].map(lambda x: t(x.capitalize()))),
+                hide_index=True,
+                column_order=["status", "meter_type", "date", "value", "existing_value"],
+                column_config={
+                    "status": t("Status"),
+                    "meter_type": t("Meter"),
+                    "date": t("Date"),
+                    "value": t("Value"),
+                    "existing_value": t("Stored value")
+                }
+            )
+        
         col1, col2 = st.columns(2)
         with col1:
              if st.button(t("💾 Save All"), type="primary"):
-                saved_count = 0
-                for _, row in edited_df.iterrows():
-                    # Create Reading Object
-                    try:
-                        reading = MeterReading(
-                            meter_type=str(row['meter_type']),
-                            meter_reading=float(row['value']),
-                            reading_date=str(row['date'])
-                        )
-                        # Save to DB
-                        if db.add_reading(user.user_id, reading):
-                            saved_count += 1
-                    except Exception as e:
-                        st.error(t("Error at row {}: {}", row, e))
-                
-                st.success(t("{} records successfully saved!", saved_count))
-                del st.session_state.import_preview_data # Clear
+                readings = readings_to_write(classified)
+                if db.add_readings(user.user_id, readings):
+                    st.success(t("{} records successfully saved!", len(readings)))
+                    if counts[IDENTICAL]:
+                        st.caption(t("{} records were already stored and skipped.", counts[IDENTICAL]))
+                    del st.session_state.import_preview_data # Clear
+                else:
+                    # Preview stays, saving again writes the rest
+                    st.error(t("Error saving records, please try again."))
                 # Refresh meter types if new ones appeared (optional logic)
         
         with col2:
@@ -1,17 +1,86 @@
 import streamlit as st
-import bcrypt
 import os
+import time
 from src.data.db_handler import DBHandler
 from src.data.models import User
+from src.logic.sessions import (
+    SESSION_RECHECK_SECONDS, SESSION_TTL_SECONDS, hash_password, check_password, update_user_stats_async,
+    issue_session_token, restore_session
+)
 from src.ui.i18n import t
 from datetime import datetime
+from typing import Optional
 import uuid
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# The signed session token is kept in a cookie: unlike the URL, it does not end up in the
+# browser history, server/proxy logs or copied links
+SESSION_COOKIE = "mdb_session"
+# Earlier versions kept the token in the URL, such links are stripped and not restored
+LEGACY_SESSION_QUERY_PARAM = "session"
 
-def check_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def store_session(user: User):
+    """
+    Keeps the user in the session state and a signed token in a cookie,
+    so a browser refresh restores the login without a password check (one user read checks revocation).
+    """
+    st.session_state['user'] = user
+    st.session_state['session_checked_at'] = time.time()
+    st.session_state['session_token'] = issue_session_token(user)
+    st.session_state.pop('session_cookie_stale', None)
+
+def _sync_session_cookie():
+    """
+    Writes the session token to the browser cookie, or deletes a cookie that is no longer valid.
+    Rendered on every rerun (unchanged content is not executed again), so a write interrupted
+    by st.rerun() is completed on the next run. The cookie reaches the server with the
+    websocket connection of the next page load (st.context.cookies).
+    """
+    token = st.session_state.get('session_token')
+    if token:
+        value, max_age = token, SESSION_TTL_SECONDS
+    elif st.session_state.get('session_cookie_stale'):
+        value, max_age = "", 0
+    else:
+        return
+    with st.sidebar:
+        st.html(
+            f"<script>document.cookie = '{SESSION_COOKIE}={value}; path=/; max-age={max_age}; SameSite=Strict'"
+            " + (location.protocol === 'https:' ? '; Secure' : '');</script>",
+            unsafe_allow_javascript=True
+        )
+
+def warm_up(db: DBHandler, user: User):
+    """
+    Starts loading the user's meters and analytics in the background (see datasets.start_warm_up).
+    """
+    # Imported here, the login screen does not load pandas
+    from src.logic.datasets import start_warm_up
+    start_warm_up(db, user.user_id)
+
+def clear_session():
+    st.session_state.pop('user', None)
+    st.session_state.pop('session_checked_at', None)
+    # The cookie is deleted by the next _sync_session_cookie, and not restored in this session again
+    if st.session_state.pop('session_token', None) or SESSION_COOKIE in st.context.cookies:
+        st.session_state['session_cookie_stale'] = True
+
+def logout(db: DBHandler):
+    """
+    Ends the session and revokes all session tokens of the user (also copied or leaked ones).
+    """
+    user = st.session_state.get('user')
+    if user:
+        db.revoke_sessions(user.username)
+    clear_session()
+
+def _session_valid(db: DBHandler, user: User) -> Optional[User]:
+    """
+    The current user item if the session's token generation was not revoked meanwhile, otherwise None.
+    """
+    current = db.get_user(user.username)
+    if current is None or current.session_generation != user.session_generation:
+        return None
+    return current
 
 def login_form(db: DBHandler):
     with st.form("login_form"):
@@ -25,9 +94,13 @@ def login_form(db: DBHandler):
             password = password.strip()
             
             user = db.get_user(username)
-            if user and check_password(password, user.password_hash):
-                db.update_user_stats(user.username)
-                st.session_state['user'] = user
+            password_ok = check_password(password, user.password_hash) if user else False
+            if password_ok is None:
+                st.error(t("Login is busy, please try again in a moment."))
+            elif password_ok:
+                update_user_stats_async(db, user.username)
+                store_session(user)
+                warm_up(db, user)
                 st.success(t("Welcome back, {}!", user.username))
                 st.rerun()
             else:
@@ -60,10 +133,17 @@ def register_form(db: DBHandler):
             
             user_id = old_chat_id if old_chat_id else str(uuid.uuid4())
             
+            try:
+                password_hash = hash_password(password)
+            except Exception as e:
+                print(f"Error hashing password: {e}")
+                st.error(t("Login is busy, please try again in a moment."))
+                return
+
             new_user = User(
                 username=username,
                 user_id=user_id,
-                password_hash=hash_password(password),
+                password_hash=password_hash,
                 created_at=datetime.now().isoformat()
             )
             
@@ -73,8 +153,13 @@ def register_form(db: DBHandler):
                 st.error(t("Registration failed. Please try again."))
 
 def auth_flow(db: DBHandler):
-    if 'user' in st.session_state:
-        return st.session_state['user']
+    if LEGACY_SESSION_QUERY_PARAM in st.query_params:
+        del st.query_params[LEGACY_SESSION_QUERY_PARAM]
+
+    user = _current_user(db)
+    _sync_session_cookie()
+    if user:
+        return user
     
     # Sidebar: Login & Register
     with st.sidebar:
@@ -96,3 +181,29 @@ def auth_flow(db: DBHandler):
     st.markdown(t("HOME_PAGE_DESCRIPTION"))
     
     return None
+
+def _current_user(db: DBHandler) -> Optional[User]:
+    if 'user' in st.session_state:
+        user = st.session_state['user']
+        # Open sessions notice a logout elsewhere within SESSION_RECHECK_SECONDS
+        if time.time() - st.session_state.get('session_checked_at', 0) < SESSION_RECHECK_SECONDS:
+            return user
+        if _session_valid(db, user):
+            st.session_state['session_checked_at'] = time.time()
+            return user
+        clear_session()
+
+    token = None if st.session_state.get('session_cookie_stale') else st.context.cookies.get(SESSION_COOKIE)
+    if token:
+        user = restore_session(token)
+        # One user read: the token may have been revoked by a logout
+        current = _session_valid(db, user) if user else None
+        if current:
+            user.ai_quota_used, user.quota_month = current.ai_quota_used, current.quota_month
+            st.session_state['user'] = user
+            st.session_state['session_checked_at'] = time.time()
+            warm_up(db, user)
+            return user
+        # Expired, revoked or tampered
+        st.session_state['session_cookie_stale'] = True
+    return None
@@ -2,13 +2,14 @@ import streamlit as st
 import pandas as pd
 from src.data.db_handler import DBHandler
 from src.data.models import User, MeterReading
+from src.logic.datasets import get_meter_types, get_readings
 from src.ui.i18n import t
 from datetime import date
 
 def data_entry_page(db: DBHandler, user: User):
     st.header(t("Data Entry"))
     
-    meter_types = db.get_meter_types(user.user_id)
+    meter_types = get_meter_types(db, user.user_id)
     if not meter_types:
         st.warning(t("No meter types defined. Go to Settings to add one."))
         return
@@ -18,8 +19,8 @@ def data_entry_page(db: DBHandler, user: User):
     
     for i, selected_type in enumerate(meter_types):
         with tabs[i]:
-            # Fetch readings for this type
-            readings = db.get_readings(user.user_id, selected_type)
+            # Fetch readings for this type (shared cache, refreshed by every write)
+            readings = get_readings(db, user.user_id, selected_type)
             
             # Determine default value (last reading)
             default_value = 0.0
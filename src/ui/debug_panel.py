@@ -0,0 +1,44 @@
+import os
+import streamlit as st
+from src.logic.profiling import RerunProfile
+from src.ui.session_memory import memory_report, state_sizes
+
+def profiling_enabled() -> bool:
+    """
+    Opt-in via ?profile=1 in the URL (per session, ?profile=0 turns it off again)
+    or PROFILING=1 in the environment (all sessions).
+    """
+    if "profile" in st.query_params:
+        st.session_state.profiling = st.query_params["profile"] == "1"
+    return st.session_state.get("profiling", os.environ.get("PROFILING") == "1")
+
+def render_profile_panel(profile: RerunProfile):
+    with st.sidebar.expander("🐞 Profiling", expanded=True):
+        st.caption(f"Rerun: {profile.total_ms:.0f} ms")
+        c1, c2 = st.columns(2)
+        c1.metric("DynamoDB calls", profile.db_round_trips)
+        c2.metric("RCU / WCU", f"{profile.db_read_units:.1f} / {profile.db_write_units:.1f}")
+
+        rows = profile.summary()
+        if rows:
+            st.dataframe(
+                [{"span": r["name"], "cat": r["category"], "n": r["calls"],
+                  "ms": round(r["total_ms"], 1), "max": round(r["max_ms"], 1)} for r in rows],
+                hide_index=True,
+                width="stretch"
+            )
+        st.caption("Trace: .cache/traces/trace.json (ui.perfetto.dev)")
+
+        # Memory: this session's state, all sessions (as of the last sweep) and the shared cache
+        sizes = state_sizes(st.session_state)
+        report = memory_report()
+        cache = report["shared_cache"]
+        c1, c2 = st.columns(2)
+        c1.metric("Session state", f"{sum(sizes.values()) / 1024:.0f} KB")
+        c2.metric("All sessions", f"{report['session_bytes'] / 1024 ** 2:.1f} MB",
+                  help=f"{report['sessions']} sessions, {report['idle_sessions']} idle (spilled)")
+        st.progress(min(cache["bytes"] / cache["max_bytes"], 1.0) if cache["max_bytes"] else 0.0,
+                    text=f"Shared cache: {cache['bytes'] / 1024 ** 2:.1f} / {(cache['max_bytes'] or 0) / 1024 ** 2:.0f} MB, "
+                         f"{cache['entries']} entries, {cache['evictions']} evicted")
+        largest = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:5]
+        st.caption(", ".join(f"{key}: {size / 1024:.0f} KB" for key, size in largest))
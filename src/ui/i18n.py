@@ -62,6 +62,7 @@ Verfolge monatliche Daten, die dir wichtig sind:
         "Register": "Registrieren",
         "Welcome back, {}!": "Willkommen zurück, {}!",
         "Invalid username or password": "Ungültiger Benutzername oder Passwort",
+        "Login is busy, please try again in a moment.": "Die Anmeldung ist gerade ausgelastet, bitte versuche es gleich noch einmal.",
         "Passwords do not match": "Passwörter stimmen nicht überein",
         "Username already exists": "Benutzername existiert bereits",
         "Legacy Chat ID (Optional)": "Alte Chat-ID (Optional, falls du Daten migrieren willst)",
@@ -78,6 +79,7 @@ Verfolge monatliche Daten, die dir wichtig sind:
         "No data.": "Keine Daten.",
         
         # Dashboard
+        "Loading...": "Wird geladen...",
         "No readings.": "Keine Messwerte.",
         "Not enough data to calculate consumption.": "Nicht genügend Daten für Verbrauchsberechnung.",
         "Filter Years": "Jahre filtern",
@@ -150,18 +152,29 @@ Verfolge monatliche Daten, die dir wichtig sind:
         "System & Quota": "System & Quota",
         "AI Requests Used (Month)": "Genutzte KI-Anfragen (Monat)",
         "Data Categories": "Daten-Kategorien",
+        "AI usage & latency (since server start)": "KI-Nutzung & Latenz (seit Serverstart)",
+        "Feature": "Funktion",
+        "Calls": "Aufrufe",
+        "Errors": "Fehler",
+        "Input Tokens": "Eingabe-Tokens",
+        "Output Tokens": "Ausgabe-Tokens",
+        "Cached Tokens": "Gecachte Tokens",
+        "Est. Cost (USD)": "Geschätzte Kosten (USD)",
 
         # AI Pages
         "🤖 Talk to your Data": "🤖 Sprich mit deinen Daten",
         "Analyze your monthly data with AI support (Powered by AWS Bedrock / Claude 3.5 Sonnet)": "Analysiere deine monatlichen Daten mit KI-Unterstützung (Powered by AWS Bedrock / Claude 3.5 Sonnet)",
         "Monthly Quota: {}/{} requests": "Monats-Quota: {}/{} Anfragen",
         "You have reached your monthly limit of {} requests. Come back next month!": "Du hast dein monatliches Limit von {} Anfragen erreicht. Komm nächsten Monat wieder!",
+        "The AI is not available right now, please try again in a moment.": "Die KI ist gerade nicht verfügbar, bitte versuche es gleich noch einmal.",
         "🗑️ Start new chat": "🗑️ Neuen Chat beginnen",
         "Clears the current chat history": "Löscht den aktuellen Chatverlauf",
         "Ask a question about your data...": "Stelle eine Frage zu deinen Daten...",
         "⏳ *Analyzing data...*": "⏳ *Analysiere Daten...*",
         "Unfortunately, I cannot find any meter data in your profile. Please add data in the dashboard first.": "Ich finde leider keine Zählerdaten in deinem Profil. Bitte füge erst Daten im Dashboard hinzu.",
         "Insufficient data available for analysis.": "Keine ausreichenden Daten für eine Analyse vorhanden.",
+        "Data context: {} tokens ({})": "Datenkontext: {} Tokens ({})",
+        "⚡ Answer from cache (no quota used)": "⚡ Antwort aus dem Cache (kein Kontingent verbraucht)",
         "CHAT_GREETING": "Hallo! Ich habe Zugriff auf deine monatlichen Daten. Frag mich nach Trends, Vergleichen oder Details – zum Beispiel 'Wie war mein Stromverbrauch 2023?', 'Analysiere meinen Gewichtsverlauf' oder 'Regnet es dieses Jahr mehr als letztes Jahr?'.",
         
         "🤖 AI Data Import": "🤖 KI Daten-Import",
@@ -169,19 +182,34 @@ Verfolge monatliche Daten, die dir wichtig sind:
         "Paste data here (Excel, CSV, Notes...)": "Daten hier einfügen (Excel, CSV, Notizen...)",
         "Example:\nJan 2023: Electricity 1050, Water 50\nFeb 2023: Electricity 1120, Water 52\n...": "Beispiel:\nJan 2023: Strom 1050, Wasser 50\nFeb 2023: Strom 1120, Wasser 52\n...",
         "Or upload an image (Photo, Scan)": "Oder lade ein Bild hoch (Foto, Scan)",
+        "Image optimized: {} KB → {} KB ({} KB saved, {} page(s))": "Bild optimiert: {} KB → {} KB ({} KB gespart, {} Seite(n))",
+        "The file could not be read as an image: {}": "Die Datei konnte nicht als Bild gelesen werden: {}",
         "Start AI Analysis": "KI-Analyse starten",
         "Please enter text first.": "Bitte gib erst Text ein.",
         "Please enter text or upload an image.": "Bitte gib Text ein oder lade ein Bild hoch.",
         "Analyzing structure...": "Analysiere Struktur...",
         "Analyzing data...": "Analysiere Daten...",
+        "Cancel analysis": "Analyse abbrechen",
+        "Analysis cancelled.": "Analyse abgebrochen.",
         "AI Error: {}": "KI-Fehler: {}",
         "Could not find valid data.": "Konnte keine gültigen Daten finden.",
         "{} records found!": "{} Datensätze gefunden!",
         "Error processing response: {}...": "Fehler beim Verarbeiten der Antwort: {}...",
+        "{} of {} parts could not be read by the AI and were skipped.": "{} von {} Teilen konnten von der KI nicht gelesen werden und wurden übersprungen.",
         "Preview": "Vorschau",
         "💾 Save All": "💾 Alle speichern",
         "{} records successfully saved!": "{} Einträge erfolgreich gespeichert!",
-        "Error at row {}: {}": "Fehler bei Zeile {}: {}",
+        "New": "Neu",
+        "Changed": "Geändert",
+        "Conflicting": "Widersprüchlich",
+        "Invalid": "Ungültig",
+        "Identical": "Unverändert",
+        "Rows with different values for the same meter and date are not saved. Correct them in the table above.": "Zeilen mit unterschiedlichen Werten für denselben Zähler und dasselbe Datum werden nicht gespeichert. Korrigiere sie in der Tabelle oben.",
+        "Status": "Status",
+        "Meter": "Zähler",
+        "Stored value": "Gespeicherter Wert",
+        "{} records were already stored and skipped.": "{} Einträge waren bereits gespeichert und wurden übersprungen.",
+        "Error saving records, please try again.": "Fehler beim Speichern, bitte erneut versuchen.",
     }
 }
 
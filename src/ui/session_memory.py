@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from src.logic.cache import estimate_size, shared_cache
+
+# Sessions without a rerun for this long give up their large state
+IDLE_SECONDS = 15 * 60
+SWEEP_INTERVAL_SECONDS = 60
+SPILL_DIR = os.path.join(".cache", "sessions")
+# Spill files of sessions that never came back are deleted after this
+SPILL_TTL_SECONDS = 24 * 3600
+
+# Recreated on demand by the pages, simply dropped from idle sessions
+DROP_KEYS = ("llm_client", "chat_history")
+# Written to SPILL_DIR for idle sessions and put back on their next rerun
+SPILL_KEYS = ("messages", "import_preview_data")
+
+class _TrackedSession:
+    def __init__(self, state):
+        self.state = state  # SafeSessionState of the latest rerun
+        self.last_active = time.time()
+        self.spilled = False
+        self.bytes = 0  # Size of the session state at the last sweep
+
+# session_id -> _TrackedSession of all sessions of this process
+_sessions: Dict[str, _TrackedSession] = {}
+_lock = threading.Lock()
+_last_sweep = time.time()
+
+def _spill_path(session_id: str) -> str:
+    return os.path.join(SPILL_DIR, f"{session_id}.json")
+
+def state_sizes(state) -> Dict[str, int]:
+    """
+    Estimated bytes per session state key (st.session_state or the SafeSessionState of a run context).
+    """
+    items = state.filtered_state.items() if hasattr(state, "filtered_state") else state.to_dict().items()
+    return {str(key): estimate_size(value) for key, value in items}
+
+def track_session():
+    """
+    Call at the start of every rerun. Puts back state spilled while the session was idle,
+    and evicts the large state of idle sessions (at most every SWEEP_INTERVAL_SECONDS).
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    with _lock:
+        tracked = _sessions.get(ctx.session_id)
+        # A session unknown to the registry may still have a spill file (dropped while disconnected)
+        restore = tracked is None or tracked.spilled
+        if tracked is None:
+            tracked = _sessions[ctx.session_id] = _TrackedSession(ctx.session_state)
+        tracked.state = ctx.session_state
+        tracked.last_active = time.time()
+        tracked.spilled = False
+        if restore:
+            _restore(ctx.session_id, ctx.session_state)
+    _maybe_sweep()
+
+def _restore(session_id: str, state):
+    path = _spill_path(session_id)
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            spilled = json.load(f)
+        os.remove(path)
+    except (OSError, ValueError) as e:
+        print(f"Error restoring session state: {e}")
+        return
+    for key, value in spilled.items():
+        if key not in state:
+            state[key] = value
+
+def _evict(session_id: str, state) -> int:
+    """
+    Spills SPILL_KEYS to disk and drops DROP_KEYS. Returns the estimated bytes freed.
+    """
+    freed = 0
+    spill = {key: state[key] for key in SPILL_KEYS if key in state}
+    if spill:
+        try:
+            os.makedirs(SPILL_DIR, exist_ok=True)
+            tmp_path = _spill_path(session_id) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(spill, f, ensure_ascii=False)
+            os.replace(tmp_path, _spill_path(session_id))
+        except (OSError, TypeError, ValueError) as e:
+            # Stays in memory
+            print(f"Error spilling session state: {e}")
+            spill = {}
+    for key in list(spill) + [key for key in DROP_KEYS if key in state]:
+        freed += estimate_size(state[key])
+        del state[key]
+    return freed
+
+def _maybe_sweep():
+    global _last_sweep
+    now = time.time()
+    with _lock:
+        if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        _last_sweep = now
+
+        active = runtime.get_instance() if runtime.exists() else None
+        freed = 0
+        for session_id, tracked in list(_sessions.items()):
+            if active is not None and not active.is_active_session(session_id):
+                # Closed tab: Streamlit frees the state, we only forget the session
+                del _sessions[session_id]
+                continue
+            if not tracked.spilled and now - tracked.last_active > IDLE_SECONDS:
+                freed += _evict(session_id, tracked.state)
+                tracked.spilled = True
+            tracked.bytes = sum(state_sizes(tracked.state).values())
+    if freed:
+        print(f"Evicted {freed / 1024:.0f} KB of idle session state")
+
+    # Leftovers of sessions that never came back
+    try:
+        for name in os.listdir(SPILL_DIR):
+            path = os.path.join(SPILL_DIR, name)
+            if now - os.path.getmtime(path) > SPILL_TTL_SECONDS:
+                os.remove(path)
+    except OSError:
+        pass
+
+def memory_report() -> Dict[str, Any]:
+    """
+    Sessions and their state size (as of the last sweep) plus the shared cache usage.
+    """
+    with _lock:
+        sessions = list(_sessions.values())
+    return {
+        "sessions": len(sessions),
+        "idle_sessions": sum(1 for s in sessions if s.spilled),
+        "session_bytes": sum(s.bytes for s in sessions),
+        "shared_cache": shared_cache.stats()
+    }
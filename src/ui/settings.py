@@ -1,7 +1,9 @@
 import streamlit as st
 from src.data.db_handler import DBHandler
-from src.data.models import User
+from src.data.models import User, QUOTA_LIMIT
+from src.logic.telemetry import telemetry
 from src.ui.i18n import t
+from datetime import datetime
 
 def settings_page(db: DBHandler, user: User):
     st.header(t("Define Data Categories"))
@@ -88,12 +90,14 @@ def settings_page(db: DBHandler, user: User):
             # 2. Configuration
             col1, col2 = st.columns(2)
             
+            config = db.get_meter_configs(user.user_id, m_type, ['unit', 'eval_mode'])
+
             # Unit
-            current_unit = db.get_meter_config(user.user_id, m_type, 'unit') or ''
+            current_unit = config['unit'] or ''
             new_unit = col1.text_input(t("Unit"), value=current_unit, key=f"unit_{m_type}")
             
             # Evaluation Mode
-            current_mode = db.get_meter_config(user.user_id, m_type, 'eval_mode') or 'difference'
+            current_mode = config['eval_mode'] or 'difference'
             
             # Re-using the options defined above for consistency
             mode_options = {
@@ -132,5 +136,25 @@ def settings_page(db: DBHandler, user: User):
     st.caption(f"{t('Logged in as')}: {user.username}")
     
     col_q1, col_q2 = st.columns(2)
-    col_q1.metric(t("AI Requests Used (Month)"), f"{user.ai_quota_used} / 50")
+    current_month_str = datetime.now().strftime("%Y-%m")
+    quota_used = user.ai_quota_used if user.quota_month == current_month_str else 0
+    col_q1.metric(t("AI Requests Used (Month)"), f"{quota_used} / {QUOTA_LIMIT}")
     col_q2.metric(t("Data Categories"), len(current_types))
+
+    # LLM telemetry of this user (in-memory, since the last server start)
+    usage = telemetry.user_summary(user.username)
+    if usage:
+        with st.expander(t("AI usage & latency (since server start)"), expanded=False):
+            rows = [{
+                t("Feature"): feature,
+                t("Calls"): u["calls"],
+                t("Errors"): u["errors"],
+                "p50 (ms)": round(u["wall_ms_p50"] or 0),
+                "p95 (ms)": round(u["wall_ms_p95"] or 0),
+                "TTFT p50 (ms)": round(u["ttft_ms_p50"]) if u["ttft_ms_p50"] is not None else None,
+                t("Input Tokens"): u["input_tokens"],
+                t("Output Tokens"): u["output_tokens"],
+                t("Cached Tokens"): u["cache_read_tokens"],
+                t("Est. Cost (USD)"): u["cost_usd"]
+            } for feature, u in usage.items()]
+            st.dataframe(rows, hide_index=True, width="stretch")
@@ -0,0 +1,251 @@
+"""
+Local stand-in for the Bedrock runtime API (invoke_model, invoke_model_with_response_stream
+and count_tokens) with configurable latency, throughput, token counts and failure injection.
+
+Usage:
+    python tools/fake_bedrock.py --port 8765 --first-token-ms 400 --tokens-per-second 60
+
+Point the app at it via .streamlit/secrets.toml or the environment:
+    BEDROCK_ENDPOINT_URL = "http://127.0.0.1:8765"
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Defaults, overridable via command line (see main)
+CONFIG = {
+    "first_token_ms": 400,     # Latency until the first token / the response header
+    "tokens_per_second": 60,   # Output throughput
+    "output_tokens": 150,      # Length of chat answers
+    "chars_per_token": 3.5,    # Used to estimate input tokens from the request
+    "failure_rate": 0.0,       # Share of requests answered with a 500 error
+    "throttle_rate": 0.0,      # Share of requests answered with a 429 ThrottlingException
+    "cache_hits": True,        # Report cache_control prefixes as cache reads from the 2nd request on
+}
+
+_seen_prefixes = set()
+_seen_lock = threading.Lock()
+
+WORDS = ("Verbrauch Monat Jahr Zähler Trend Durchschnitt höher niedriger Vergleich Wert "
+         "Daten Sommer Winter Anstieg Rückgang stabil").split()
+
+# --- AWS event stream encoding (application/vnd.amazon.eventstream) ---
+
+def _encode_header(name: str, value: str) -> bytes:
+    name_bytes = name.encode("utf-8")
+    value_bytes = value.encode("utf-8")
+    # Header value type 7 = string
+    return struct.pack("!B", len(name_bytes)) + name_bytes + struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+
+def encode_event(payload: bytes, headers: dict) -> bytes:
+    header_bytes = b"".join(_encode_header(k, v) for k, v in headers.items())
+    total_length = 12 + len(header_bytes) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(header_bytes))
+    prelude_crc = struct.pack("!I", zlib.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + prelude_crc + header_bytes + payload
+    return message + struct.pack("!I", zlib.crc32(message) & 0xFFFFFFFF)
+
+def chunk_event(data: dict) -> bytes:
+    # Bedrock wraps every Anthropic stream event as {"bytes": base64(json)}
+    payload = json.dumps({"bytes": base64.b64encode(json.dumps(data).encode("utf-8")).decode("ascii")}).encode("utf-8")
+    return encode_event(payload, {
+        ":event-type": "chunk",
+        ":content-type": "application/json",
+        ":message-type": "event"
+    })
+
+# --- Fake model ---
+
+def _request_text(request: dict) -> str:
+    parts = []
+    system = request.get("system", "")
+    if isinstance(system, list):
+        parts.extend(block.get("text", "") for block in system)
+    else:
+        parts.append(system)
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+            continue
+        for block in content:
+            if block.get("type") == "text":
+                parts.append(block.get("text", ""))
+            elif block.get("type") == "tool_result":
+                parts.append(str(block.get("content", "")))
+            elif block.get("type") == "image":
+                # Claude bills ~ (width * height) / 750 tokens, assume a 1568px page
+                parts.append("x" * int(1600 * CONFIG["chars_per_token"]))
+    return "\n".join(parts)
+
+def _usage(request: dict, output_tokens: int) -> dict:
+    input_tokens = int(len(_request_text(request)) / CONFIG["chars_per_token"]) + 1
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+             "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+
+    system = request.get("system")
+    if CONFIG["cache_hits"] and isinstance(system, list):
+        cached_text = "".join(b.get("text", "") for b in system if b.get("cache_control"))
+        cached_tokens = int(len(cached_text) / CONFIG["chars_per_token"])
+        with _seen_lock:
+            hit = cached_text in _seen_prefixes
+            _seen_prefixes.add(cached_text)
+        usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = cached_tokens
+        usage["input_tokens"] = max(input_tokens - cached_tokens, 1)
+    return usage
+
+def _answer_text(request: dict) -> str:
+    system = request.get("system")
+    system_text = system if isinstance(system, str) else ""
+    if "Data Extraction Assistant" in system_text:
+        # Smart import: pick up "date ... number" pairs from the pasted text
+        text = _request_text({"messages": request.get("messages", [])})
+        records = []
+        for date, value in re.findall(r"(\d{4}-\d{2}(?:-\d{2})?)\D{1,40}?(\d+(?:[.,]\d+)?)", text):
+            records.append({"meter_type": "Electricity", "date": date if len(date) == 10 else date + "-01",
+                            "value": float(value.replace(",", "."))})
+        return json.dumps(records)
+    words = [random.choice(WORDS) for _ in range(int(CONFIG["output_tokens"] * 0.75))]
+    return " ".join(words) + "."
+
+def _split_tokens(text: str) -> list:
+    size = max(int(CONFIG["chars_per_token"]), 1)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class FakeBedrockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+    def _send_json(self, status: int, data: dict, error_type: str = None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", error_type)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+        match = re.match(r"^/model/([^/]+)/(invoke|invoke-with-response-stream|count-tokens)$", self.path)
+        if not match:
+            self._send_json(404, {"message": f"Unknown path {self.path}"}, "ResourceNotFoundException")
+            return
+        operation = match.group(2)
+
+        if operation == "count-tokens":
+            # The invoke body is a blob, i.e. base64 inside the JSON request
+            body = json.loads(raw).get("input", {}).get("invokeModel", {}).get("body", "")
+            request = json.loads(base64.b64decode(body) or b"{}")
+            self._send_json(200, {"inputTokens": _usage(request, 0)["input_tokens"]})
+            return
+
+        # Failure injection
+        roll = random.random()
+        if roll < CONFIG["throttle_rate"]:
+            self._send_json(429, {"message": "Too many requests, please wait before trying again."}, "ThrottlingException")
+            return
+        if roll < CONFIG["throttle_rate"] + CONFIG["failure_rate"]:
+            self._send_json(500, {"message": "Injected failure"}, "InternalServerException")
+            return
+
+        request = json.loads(raw)
+        text = _answer_text(request)
+        tokens = _split_tokens(text)
+        usage = _usage(request, len(tokens))
+        start = time.perf_counter()
+        time.sleep(CONFIG["first_token_ms"] / 1000)
+
+        if operation == "invoke":
+            time.sleep(len(tokens) / CONFIG["tokens_per_second"])
+            self._send_json(200, {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": usage
+            })
+            return
+
+        # Streaming response
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data: dict):
+            event = chunk_event(data)
+            self.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+
+        send({"type": "message_start", "message": {"id": "msg_fake", "type": "message", "role": "assistant",
+                                                   "content": [], "usage": {**usage, "output_tokens": 1}}})
+        send({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        first_token_ms = (time.perf_counter() - start) * 1000
+        for token in tokens:
+            send({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}})
+            time.sleep(1 / CONFIG["tokens_per_second"])
+        send({"type": "content_block_stop", "index": 0})
+        send({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(tokens)}})
+        send({"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+            "inputTokenCount": usage["input_tokens"],
+            "outputTokenCount": len(tokens),
+            "invocationLatency": int((time.perf_counter() - start) * 1000),
+            "firstByteLatency": int(first_token_ms)
+        }})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **config) -> ThreadingHTTPServer:
+    """
+    Starts the fake endpoint in a background thread (port 0 = any free port).
+    Returns the server, its URL is f"http://{host}:{server.server_port}".
+    """
+    CONFIG.update(config)
+    server = ThreadingHTTPServer((host, port), FakeBedrockHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Bedrock runtime endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=float, default=CONFIG["first_token_ms"])
+    parser.add_argument("--tokens-per-second", type=float, default=CONFIG["tokens_per_second"])
+    parser.add_argument("--output-tokens", type=int, default=CONFIG["output_tokens"])
+    parser.add_argument("--failure-rate", type=float, default=CONFIG["failure_rate"])
+    parser.add_argument("--throttle-rate", type=float, default=CONFIG["throttle_rate"])
+    parser.add_argument("--no-cache-hits", action="store_true")
+    args = parser.parse_args()
+
+    CONFIG.update(
+        first_token_ms=args.first_token_ms,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        failure_rate=args.failure_rate,
+        throttle_rate=args.throttle_rate,
+        cache_hits=not args.no_cache_hits
+    )
+    server = ThreadingHTTPServer((args.host, args.port), FakeBedrockHandler)
+    server.daemon_threads = True
+    print(f"Fake Bedrock listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,678 @@
+"""
+In-process stand-in for the low-level boto3 DynamoDB client, for budget and load tests without AWS.
+
+Supports what DBHandler and the tools use: get_item, put_item, update_item, delete_item, query
+(in pages of up to 1 MB like DynamoDB), scan, batch_get_item, batch_write_item, transact_get_items and transact_write_items, with
+condition/update expressions (SET incl. if_not_exists and +/-, ADD, REMOVE; comparisons,
+attribute_exists/attribute_not_exists, begins_with, BETWEEN, AND/OR/NOT) and query projections.
+Request limits are enforced like DynamoDB does (ValidationException): at most BATCH_WRITE_MAX_ITEMS
+per BatchWriteItem, TRANSACTION_MAX_ACTIONS per TransactWriteItems, one action per item.
+
+Every call emits the same botocore events as a real client (provide-client-params, before-call,
+after-call), so DBHandler's metrics and profiling hooks work unchanged, and returns
+ConsumedCapacity when asked for it (estimated from the item size like DynamoDB does).
+
+It can also be served over HTTP (DynamoDB JSON protocol) for a separate app process, e.g. a
+`streamlit run` pointed at it with DYNAMODB_ENDPOINT_URL:
+    python tools/fake_dynamodb.py --port 8766 --latency-ms 5
+
+Usage:
+    store = FakeDynamoDB.for_app()
+    db = DBHandler(dynamo_client=FakeDynamoClient(store, latency_ms=5))
+"""
+import argparse
+import copy
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+
+# DynamoDB request limits
+BATCH_WRITE_MAX_ITEMS = 25
+TRANSACTION_MAX_ACTIONS = 100
+
+# --- Errors (same codes and class names as the real client) ---
+
+def _error_class(code: str):
+    return type(code, (ClientError,), {})
+
+class _Exceptions:
+    ConditionalCheckFailedException = _error_class("ConditionalCheckFailedException")
+    TransactionCanceledException = _error_class("TransactionCanceledException")
+    ResourceNotFoundException = _error_class("ResourceNotFoundException")
+    ValidationException = _error_class("ValidationException")
+
+def _raise(error_class, operation: str, message: str, **extra):
+    response = {"Error": {"Code": error_class.__name__, "Message": message}, **extra}
+    raise error_class(response, operation)
+
+# --- Attribute values ---
+
+def _to_python(value: Dict[str, Any]):
+    (kind, raw), = value.items()
+    if kind == "N":
+        return Decimal(raw)
+    if kind == "NS":
+        return {Decimal(v) for v in raw}
+    if kind == "SS":
+        return set(raw)
+    return raw
+
+def _from_number(number: Decimal) -> Dict[str, str]:
+    text = format(number.normalize(), "f") if number == number.to_integral() else str(number)
+    return {"N": text}
+
+# Query and Scan return at most this much data per page
+PAGE_BYTES = 1024 * 1024
+
+def _item_size(item: Dict[str, Any]) -> int:
+    # Binary values count with their length
+    return len(json.dumps(item, separators=(",", ":"), default=lambda value: "." * len(value)))
+
+def _page(items: List[Dict[str, Any]], limit: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Cuts items after Limit items or PAGE_BYTES, returns (page, more items left).
+    """
+    size = 0
+    for i, item in enumerate(items):
+        size += _item_size(item)
+        if (limit is not None and i >= limit) or (size > PAGE_BYTES and i > 0):
+            return items[:i], True
+    return items, False
+
+# --- Expression parsing ---
+
+_TOKEN = re.compile(r"\s*(<>|<=|>=|[=<>(),+\-]|#\w+|:\w+|[A-Za-z_]\w*)")
+
+def _tokenize(expression: str) -> List[str]:
+    tokens, pos = [], 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match:
+            raise ValueError(f"Cannot parse expression at: {expression[pos:]}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+class _Expression:
+    """
+    Recursive descent evaluator for condition and update expressions.
+    """
+    def __init__(self, expression: str, names: Dict[str, str], values: Dict[str, Any]):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def _peek(self, offset: int = 0) -> Optional[str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expect(self, token: str):
+        if self._next() != token:
+            raise ValueError(f"Expected {token}")
+
+    def _path(self, token: str) -> str:
+        return self.names.get(token, token) if token.startswith("#") else token
+
+    # Operand: raw attribute value dict (or None if missing)
+    def _operand(self, item: Dict[str, Any]):
+        token = self._next()
+        if token.startswith(":"):
+            return self.values[token]
+        if token in ("if_not_exists", "size", "list_append"):
+            self._expect("(")
+            first = self._operand(item)
+            if token == "size":
+                self._expect(")")
+                return {"N": str(len(first.get("S", first.get("L", []))))} if first else None
+            self._expect(",")
+            second = self._operand(item)
+            self._expect(")")
+            if token == "if_not_exists":
+                return first if first is not None else second
+            return {"L": (first or {"L": []})["L"] + second["L"]}
+        return item.get(self._path(token))
+
+    def _value(self, item: Dict[str, Any]):
+        left = self._operand(item)
+        while self._peek() in ("+", "-"):
+            operator = self._next()
+            right = self._operand(item)
+            if left is None or right is None:
+                raise ValueError("Arithmetic on a missing attribute")
+            result = _to_python(left) + _to_python(right) if operator == "+" else _to_python(left) - _to_python(right)
+            left = _from_number(result)
+        return left
+
+    # Conditions
+    def condition(self, item: Dict[str, Any]) -> bool:
+        result = self._and(item)
+        while self._peek() == "OR":
+            self._next()
+            right = self._and(item)
+            result = result or right
+        return result
+
+    def _and(self, item) -> bool:
+        result = self._not(item)
+        while self._peek() == "AND":
+            self._next()
+            right = self._not(item)
+            result = result and right
+        return result
+
+    def _not(self, item) -> bool:
+        if self._peek() == "NOT":
+            self._next()
+            return not self._not(item)
+        return self._primary(item)
+
+    def _primary(self, item) -> bool:
+        token = self._peek()
+        if token == "(":
+            self._next()
+            result = self.condition(item)
+            self._expect(")")
+            return result
+        if token in ("attribute_exists", "attribute_not_exists", "begins_with", "contains"):
+            self._next()
+            self._expect("(")
+            path = self._path(self._next())
+            if token in ("attribute_exists", "attribute_not_exists"):
+                self._expect(")")
+                return (path in item) == (token == "attribute_exists")
+            self._expect(",")
+            needle = _to_python(self._operand(item))
+            self._expect(")")
+            value = item.get(path)
+            if value is None:
+                return False
+            value = _to_python(value)
+            return value.startswith(needle) if token == "begins_with" else needle in value
+
+        left = self._value(item)
+        operator = self._next()
+        if operator == "BETWEEN":
+            low = self._value(item)
+            self._expect("AND")
+            high = self._value(item)
+            return left is not None and _to_python(low) <= _to_python(left) <= _to_python(high)
+        right = self._value(item)
+        if left is None or right is None:
+            return operator == "<>" and (left is None) != (right is None)
+        a, b = _to_python(left), _to_python(right)
+        return {"=": a == b, "<>": a != b, "<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[operator]
+
+    # Updates
+    def apply_update(self, item: Dict[str, Any]) -> List[str]:
+        """
+        Updates item in place, returns the updated attribute names.
+        """
+        # All operands are evaluated against the old item, like DynamoDB does
+        old = copy.deepcopy(item)
+        clause = None
+        updated = []
+        while self._peek() is not None:
+            if self._peek() in ("SET", "ADD", "REMOVE", "DELETE"):
+                clause = self._next()
+            path = self._path(self._next())
+            updated.append(path)
+            if clause == "SET":
+                self._expect("=")
+                item[path] = self._value(old)
+            elif clause == "ADD":
+                value = self._operand(old)
+                current = item.get(path)
+                if "N" in value:
+                    base = _to_python(current) if current else Decimal(0)
+                    item[path] = _from_number(base + _to_python(value))
+                else:
+                    kind = next(iter(value))
+                    item[path] = {kind: sorted(set((current or {kind: []})[kind]) | set(value[kind]))}
+            elif clause == "REMOVE":
+                item.pop(path, None)
+            elif clause == "DELETE":
+                value = self._operand(old)
+                kind = next(iter(value))
+                remaining = sorted(set(item.get(path, {kind: []})[kind]) - set(value[kind]))
+                if remaining:
+                    item[path] = {kind: remaining}
+                else:
+                    item.pop(path, None)
+            if self._peek() == ",":
+                self._next()
+        return updated
+
+# --- Storage ---
+
+class FakeDynamoDB:
+    """
+    Tables shared by any number of FakeDynamoClient instances (e.g. one per simulated session).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.schemas: Dict[str, Tuple[str, Optional[str]]] = {}
+        # table -> partition key value -> sort key value -> item
+        self.tables: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+
+    @classmethod
+    def for_app(cls) -> 'FakeDynamoDB':
+        store = cls()
+        store.create_table("meter_reading_bot", "chat_id_and_type", "reading_date")
+        store.create_table("meter_reading_users", "username")
+        return store
+
+    def create_table(self, name: str, hash_key: str, range_key: Optional[str] = None):
+        with self._lock:
+            self.schemas[name] = (hash_key, range_key)
+            self.tables[name] = {}
+
+    def _locate(self, table: str, key: Dict[str, Any], operation: str):
+        if table not in self.schemas:
+            _raise(_Exceptions.ResourceNotFoundException, operation, f"Table {table} not found")
+        hash_key, range_key = self.schemas[table]
+        pk = str(_to_python(key[hash_key]))
+        sk = str(_to_python(key[range_key])) if range_key else ""
+        return self.tables[table].setdefault(pk, {}), sk
+
+    def item_count(self) -> int:
+        with self._lock:
+            return sum(len(partition) for table in self.tables.values() for partition in table.values())
+
+# --- Client ---
+
+class FakeDynamoClient:
+    def __init__(self, store: Optional[FakeDynamoDB] = None, latency_ms: float = 0.0, region_name: str = "eu-central-1"):
+        self.store = store or FakeDynamoDB.for_app()
+        self.latency_ms = latency_ms
+        self.exceptions = _Exceptions
+        self.meta = SimpleNamespace(events=HierarchicalEmitter(), region_name=region_name)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {"round_trips": 0, "items_read": 0, "items_written": 0, "read_units": 0.0,
+                          "write_units": 0.0, "operations": {}}
+
+    def _call(self, operation: str, params: Dict[str, Any], handler):
+        model = SimpleNamespace(name=operation)
+        context: Dict[str, Any] = {}
+        events = self.meta.events
+        responses = events.emit(f"provide-client-params.dynamodb.{operation}", params=params, model=model, context=context)
+        params = next((r for _, r in responses if r is not None), params)
+        events.emit(f"before-call.dynamodb.{operation}", model=model, params=params, request_signer=None, context=context)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        error = None
+        read_units = write_units = 0.0
+        items_read = items_written = 0
+        try:
+            with self.store._lock:
+                parsed, items_read, items_written, read_units, write_units = handler(params)
+            status = 200
+        except ClientError as e:
+            error, parsed, status = e, e.response, 400
+
+        if params.get("ReturnConsumedCapacity") in ("TOTAL", "INDEXES") and error is None:
+            table = params.get("TableName", "-")
+            parsed["ConsumedCapacity"] = {"TableName": table, "CapacityUnits": read_units + write_units}
+        parsed.setdefault("ResponseMetadata", {"HTTPStatusCode": status, "RetryAttempts": 0})
+
+        with self._stats_lock:
+            self.stats["round_trips"] += 1
+            self.stats["items_read"] += items_read
+            self.stats["items_written"] += items_written
+            self.stats["read_units"] += read_units
+            self.stats["write_units"] += write_units
+            self.stats["operations"][operation] = self.stats["operations"].get(operation, 0) + 1
+
+        events.emit(f"after-call.dynamodb.{operation}", http_response=SimpleNamespace(status_code=status),
+                    parsed=parsed, model=model, context=context)
+        if error is not None:
+            raise error
+        return parsed
+
+    @staticmethod
+    def _read_units(size: int, consistent: bool) -> float:
+        return math.ceil(max(size, 1) / 4096) * (1.0 if consistent else 0.5)
+
+    @staticmethod
+    def _write_units(size: int) -> float:
+        return float(math.ceil(max(size, 1) / 1024))
+
+    def _check_condition(self, operation: str, params: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+        expression = params.get("ConditionExpression")
+        if not expression:
+            return True
+        return _Expression(expression, params.get("ExpressionAttributeNames"),
+                           params.get("ExpressionAttributeValues")).condition(current or {})
+
+    # --- Single item operations ---
+    def get_item(self, **params):
+        def handler(p):
+            partition, sk = self.store._locate(p["TableName"], p["Key"], "GetItem")
+            item = partition.get(sk)
+            response = {"Item": copy.deepcopy(item)} if item is not None else {}
+            units = self._read_units(_item_size(item) if item else 1, p.get("ConsistentRead", False))
+            return response, 1 if item is not None else 0, 0, units, 0.0
+        return self._call("GetItem", params, handler)
+
+    def put_item(self, **params):
+        def handler(p):
+            hash_key, range_key = self.store.schemas.get(p["TableName"], (None, None))
+            key = {k: p["Item"][k] for k in (hash_key, range_key) if k}
+            partition, sk = self.store._locate(p["TableName"], key, "PutItem")
+            if not self._check_condition("PutItem", p, partition.get(sk)):
+                _raise(_Exceptions.ConditionalCheckFailedException, "PutItem", "The conditional request failed")
+            partition[sk] = copy.deepcopy(p["Item"])
+            return {}, 0, 1, 0.0, self._write_units(_item_size(p["Item"]))
+        return self._call("PutItem", params, handler)
+
+    def update_item(self, **params):
+        def handler(p):
+            partition, sk = self.store._locate(p["TableName"], p["Key"], "UpdateItem")
+            current = partition.get(sk)
+            if not self._check_condition("UpdateItem", p, current):
+                _raise(_Exceptions.ConditionalCheckFailedException, "UpdateItem", "The conditional request failed")
+            item = copy.deepcopy(current) if current is not None else copy.deepcopy(p["Key"])
+            updated = []
+            if p.get("UpdateExpression"):
+                try:
+                    updated = _Expression(p["UpdateExpression"], p.get("ExpressionAttributeNames"),
+                                          p.get("ExpressionAttributeValues")).apply_update(item)
+                except ValueError as e:
+                    _raise(_Exceptions.ValidationException, "UpdateItem", str(e))
+            partition[sk] = item
+
+            response = {}
+            return_values = p.get("ReturnValues", "NONE")
+            if return_values == "ALL_NEW":
+                response["Attributes"] = copy.deepcopy(item)
+            elif return_values == "ALL_OLD" and current is not None:
+                response["Attributes"] = copy.deepcopy(current)
+            elif return_values == "UPDATED_NEW":
+                response["Attributes"] = {k: copy.deepcopy(item[k]) for k in updated if k in item}
+            size = max(_item_size(item), _item_size(current) if current else 0)
+            return response, 0, 1, 0.0, self._write_units(size)
+        return self._call("UpdateItem", params, handler)
+
+    def delete_item(self, **params):
+        def handler(p):
+            partition, sk = self.store._locate(p["TableName"], p["Key"], "DeleteItem")
+            current = partition.get(sk)
+            if not self._check_condition("DeleteItem", p, current):
+                _raise(_Exceptions.ConditionalCheckFailedException, "DeleteItem", "The conditional request failed")
+            partition.pop(sk, None)
+            return {}, 0, 1 if current else 0, 0.0, self._write_units(_item_size(current) if current else 1)
+        return self._call("DeleteItem", params, handler)
+
+    # --- Query ---
+    def query(self, **params):
+        def handler(p):
+            table = p["TableName"]
+            hash_key, range_key = self.store.schemas[table]
+            names = p.get("ExpressionAttributeNames") or {}
+            values = p.get("ExpressionAttributeValues") or {}
+            # The partition is addressed by "<hash key> = :value" in the key condition
+            match = re.search(r"(#?\w+)\s*=\s*(:\w+)", p["KeyConditionExpression"])
+            if not match or names.get(match.group(1), match.group(1)) != hash_key:
+                _raise(_Exceptions.ValidationException, "Query", "Key condition must address the partition key")
+            partition = self.store.tables[table].get(str(_to_python(values[match.group(2)])), {})
+
+            condition = p["KeyConditionExpression"]
+            items = [item for sk, item in sorted(partition.items())
+                     if _Expression(condition, names, values).condition(item)]
+            if not p.get("ScanIndexForward", True):
+                items.reverse()
+
+            start_key = p.get("ExclusiveStartKey")
+            if start_key and range_key:
+                # Continue after the last returned item
+                start = str(_to_python(start_key[range_key]))
+                sort_keys = [str(_to_python(i[range_key])) for i in items]
+                items = items[sort_keys.index(start) + 1:] if start in sort_keys else items
+
+            response: Dict[str, Any] = {}
+            items, more = _page(items, p.get("Limit"))
+            if more:
+                last = items[-1]
+                response["LastEvaluatedKey"] = {k: last[k] for k in (hash_key, range_key) if k}
+
+            if p.get("FilterExpression"):
+                scanned = len(items)
+                items = [i for i in items if _Expression(p["FilterExpression"], names, values).condition(i)]
+            else:
+                scanned = len(items)
+            # Capacity is charged for the full items, also with a projection
+            size = sum(_item_size(i) for i in items)
+            if p.get("ProjectionExpression"):
+                attributes = {names.get(a.strip(), a.strip()) for a in p["ProjectionExpression"].split(",")}
+                items = [{k: v for k, v in i.items() if k in attributes} for i in items]
+            response.update(Items=copy.deepcopy(items), Count=len(items), ScannedCount=scanned)
+            return response, len(items), 0, self._read_units(size, p.get("ConsistentRead", False)), 0.0
+        return self._call("Query", params, handler)
+
+    def scan(self, **params):
+        def handler(p):
+            table = p["TableName"]
+            if table not in self.store.schemas:
+                _raise(_Exceptions.ResourceNotFoundException, "Scan", f"Table {table} not found")
+            hash_key, range_key = self.store.schemas[table]
+            items = [item for pk in sorted(self.store.tables[table])
+                     for _, item in sorted(self.store.tables[table][pk].items())]
+
+            start_key = p.get("ExclusiveStartKey")
+            if start_key:
+                keys = [tuple(str(_to_python(i[k])) for k in (hash_key, range_key) if k) for i in items]
+                start = tuple(str(_to_python(start_key[k])) for k in (hash_key, range_key) if k)
+                items = items[keys.index(start) + 1:] if start in keys else items
+
+            response: Dict[str, Any] = {}
+            items, more = _page(items, p.get("Limit"))
+            if more:
+                response["LastEvaluatedKey"] = {k: items[-1][k] for k in (hash_key, range_key) if k}
+            scanned = len(items)
+            if p.get("FilterExpression"):
+                names = p.get("ExpressionAttributeNames") or {}
+                values = p.get("ExpressionAttributeValues") or {}
+                items = [i for i in items if _Expression(p["FilterExpression"], names, values).condition(i)]
+            size = sum(_item_size(i) for i in items)
+            response.update(Items=copy.deepcopy(items), Count=len(items), ScannedCount=scanned)
+            return response, len(items), 0, self._read_units(size, p.get("ConsistentRead", False)), 0.0
+        return self._call("Scan", params, handler)
+
+    # --- Batch / transactions ---
+    def batch_get_item(self, **params):
+        def handler(p):
+            responses, items_read, units = {}, 0, 0.0
+            for table, request in p["RequestItems"].items():
+                found = []
+                for key in request["Keys"]:
+                    partition, sk = self.store._locate(table, key, "BatchGetItem")
+                    item = partition.get(sk)
+                    if item is not None:
+                        found.append(copy.deepcopy(item))
+                        units += self._read_units(_item_size(item), request.get("ConsistentRead", False))
+                responses[table] = found
+                items_read += len(found)
+            return {"Responses": responses, "UnprocessedKeys": {}}, items_read, 0, units, 0.0
+        return self._call("BatchGetItem", params, handler)
+
+    def batch_write_item(self, **params):
+        def handler(p):
+            count = sum(len(requests) for requests in p["RequestItems"].values())
+            if count > BATCH_WRITE_MAX_ITEMS:
+                _raise(_Exceptions.ValidationException, "BatchWriteItem",
+                       f"Too many items requested for the BatchWriteItem call ({count} > {BATCH_WRITE_MAX_ITEMS})")
+            written, units = 0, 0.0
+            for table, requests in p["RequestItems"].items():
+                hash_key, range_key = self.store.schemas[table]
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        partition, sk = self.store._locate(table, {k: item[k] for k in (hash_key, range_key) if k}, "BatchWriteItem")
+                        partition[sk] = copy.deepcopy(item)
+                        units += self._write_units(_item_size(item))
+                    else:
+                        partition, sk = self.store._locate(table, request["DeleteRequest"]["Key"], "BatchWriteItem")
+                        partition.pop(sk, None)
+                        units += 1.0
+                    written += 1
+            return {"UnprocessedItems": {}}, 0, written, 0.0, units
+        return self._call("BatchWriteItem", params, handler)
+
+    def transact_get_items(self, **params):
+        def handler(p):
+            responses, units = [], 0.0
+            for entry in p["TransactItems"]:
+                get = entry["Get"]
+                partition, sk = self.store._locate(get["TableName"], get["Key"], "TransactGetItems")
+                item = partition.get(sk)
+                responses.append({"Item": copy.deepcopy(item)} if item is not None else {})
+                # Transactional reads cost twice a consistent read
+                units += 2 * self._read_units(_item_size(item) if item else 1, True)
+            return {"Responses": responses}, sum(1 for r in responses if r), 0, units, 0.0
+        return self._call("TransactGetItems", params, handler)
+
+    def transact_write_items(self, **params):
+        def handler(p):
+            if len(p["TransactItems"]) > TRANSACTION_MAX_ACTIONS:
+                _raise(_Exceptions.ValidationException, "TransactWriteItems",
+                       f"Member must have length less than or equal to {TRANSACTION_MAX_ACTIONS} ({len(p['TransactItems'])})")
+            # All conditions are checked before anything is written (all or nothing)
+            reasons, failed, targets = [], False, set()
+            for entry in p["TransactItems"]:
+                (kind, action), = entry.items()
+                table = action["TableName"]
+                if kind == "Put":
+                    hash_key, range_key = self.store.schemas[table]
+                    key = {k: action["Item"][k] for k in (hash_key, range_key) if k}
+                else:
+                    key = action["Key"]
+                target = (table, json.dumps(key, sort_keys=True))
+                if target in targets:
+                    _raise(_Exceptions.ValidationException, "TransactWriteItems",
+                           "Transaction request cannot include multiple operations on one item")
+                targets.add(target)
+                partition, sk = self.store._locate(table, key, "TransactWriteItems")
+                ok = self._check_condition("TransactWriteItems", action, partition.get(sk))
+                reasons.append({"Code": "None"} if ok else {"Code": "ConditionalCheckFailed"})
+                failed = failed or not ok
+            if failed:
+                _raise(_Exceptions.TransactionCanceledException, "TransactWriteItems",
+                       "Transaction cancelled", CancellationReasons=reasons)
+
+            units = 0.0
+            for entry in p["TransactItems"]:
+                (kind, action), = entry.items()
+                table = action["TableName"]
+                if kind == "Put":
+                    hash_key, range_key = self.store.schemas[table]
+                    partition, sk = self.store._locate(table, {k: action["Item"][k] for k in (hash_key, range_key) if k}, "TransactWriteItems")
+                    partition[sk] = copy.deepcopy(action["Item"])
+                    units += 2 * self._write_units(_item_size(action["Item"]))
+                elif kind == "Update":
+                    partition, sk = self.store._locate(table, action["Key"], "TransactWriteItems")
+                    item = copy.deepcopy(partition.get(sk)) if sk in partition else copy.deepcopy(action["Key"])
+                    _Expression(action["UpdateExpression"], action.get("ExpressionAttributeNames"),
+                                action.get("ExpressionAttributeValues")).apply_update(item)
+                    partition[sk] = item
+                    units += 2 * self._write_units(_item_size(item))
+                elif kind == "Delete":
+                    partition, sk = self.store._locate(table, action["Key"], "TransactWriteItems")
+                    partition.pop(sk, None)
+                    units += 2.0
+            written = sum(1 for e in p["TransactItems"] if "ConditionCheck" not in e)
+            return {}, 0, written, 0.0, units
+        return self._call("TransactWriteItems", params, handler)
+
+# --- HTTP endpoint ---
+
+def _snake_case(operation: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", operation).lower()
+
+class FakeDynamoHandler(BaseHTTPRequestHandler):
+    client: FakeDynamoClient = None  # Set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # X-Amz-Target: DynamoDB_20120810.GetItem
+        operation = self.headers.get("X-Amz-Target", "").rpartition(".")[2]
+        params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        method = getattr(self.client, _snake_case(operation), None) if operation else None
+        if method is None:
+            self._reply(400, {"__type": "com.amazon.coral.service#UnknownOperationException",
+                              "message": f"Unsupported operation {operation}"})
+            return
+        try:
+            parsed = method(**params)
+        except ClientError as e:
+            error = dict(e.response)
+            details = error.pop("Error", {})
+            error.pop("ResponseMetadata", None)
+            self._reply(400, {"__type": f"com.amazonaws.dynamodb.v20120810#{details.get('Code')}",
+                              "message": details.get("Message", ""), **error})
+            return
+        parsed = {k: v for k, v in parsed.items() if k != "ResponseMetadata"}
+        self._reply(200, parsed)
+
+def make_server(store: Optional[FakeDynamoDB] = None, host: str = "127.0.0.1", port: int = 0,
+                latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("Handler", (FakeDynamoHandler,), {"client": FakeDynamoClient(store, latency_ms=latency_ms)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_server(store: Optional[FakeDynamoDB] = None, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Serves the store in a background thread (port 0 = any free port).
+    Returns the server, its URL is f"http://{host}:{server.server_port}".
+    """
+    server = make_server(store, host, port, latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake DynamoDB endpoint (in-memory, empty app tables)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(FakeDynamoDB.for_app(), args.host, args.port, args.latency_ms)
+    print(f"Fake DynamoDB listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
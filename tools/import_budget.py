@@ -0,0 +1,114 @@
+"""
+Cold-start import budget for the app.
+
+Renders the unauthenticated landing page (app.main() in Streamlit bare mode) in a fresh
+interpreter with `python -X importtime` and checks
+  - that none of the FORBIDDEN modules were loaded,
+  - that the imports on top of streamlit itself stay within the budget.
+Page modules are measured too (informational, loaded on first visit).
+
+Usage:
+    python tools/import_budget.py [--budget-ms 250] [--top 15]
+Exits with 1 if the budget is exceeded or a forbidden module was loaded.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LANDING_BUDGET_MS = 250
+# Must not be imported before a user logs in
+# (numpy and PIL are not listed: streamlit itself loads them for st.image)
+FORBIDDEN = ("pandas", "altair", "boto3", "botocore", "bcrypt")
+
+MARKER = "--- import budget start ---"
+
+LANDING_SNIPPET = f"""
+import sys
+import streamlit
+print({MARKER!r}, file=sys.stderr, flush=True)
+import app
+app.main()
+print(",".join(m for m in {FORBIDDEN!r} if m in sys.modules))
+"""
+
+PAGE_SNIPPET = """
+import sys
+import streamlit
+import app
+print({marker!r}, file=sys.stderr, flush=True)
+import {module}
+"""
+
+def run_importtime(snippet: str):
+    """
+    Runs the snippet in a fresh interpreter, returns (stdout, [(cumulative_us, self_us, depth, module)])
+    for all imports after MARKER.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    entries = []
+    started = False
+    for line in proc.stderr.splitlines():
+        if line.startswith(MARKER):
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return proc.stdout, entries
+
+def total_ms(entries) -> float:
+    # Top level imports (least indented) contain all nested ones
+    if not entries:
+        return 0.0
+    top = min(depth for _, _, depth, _ in entries)
+    return sum(cumulative for cumulative, _, depth, _ in entries if depth == top) / 1000
+
+def print_top(entries, count: int):
+    for cumulative, self_us, depth, name in sorted(entries, reverse=True)[:count]:
+        print(f"    {cumulative / 1000:8.1f} ms  (self {self_us / 1000:6.1f})  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import budget")
+    parser.add_argument("--budget-ms", type=float, default=LANDING_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from app import PAGES
+
+    stdout, entries = run_importtime(LANDING_SNIPPET)
+    loaded = [m for m in stdout.strip().splitlines()[-1].split(",") if m] if stdout.strip() else []
+    landing_ms = total_ms(entries)
+    print(f"Landing page: {landing_ms:.1f} ms of imports on top of streamlit (budget {args.budget_ms:.0f} ms)")
+    print_top(entries, args.top)
+
+    print("\nPage modules (on first visit, on top of the landing page):")
+    for page, (module, _) in PAGES.items():
+        _, page_entries = run_importtime(PAGE_SNIPPET.format(marker=MARKER, module=module))
+        print(f"  {page:<24} {total_ms(page_entries):8.1f} ms  ({module})")
+
+    failed = False
+    if loaded:
+        print(f"\nFAIL: landing page loaded {', '.join(loaded)}")
+        failed = True
+    if landing_ms > args.budget_ms:
+        print(f"\nFAIL: landing page imports take {landing_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("\nOK")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Concurrent-session load test of the Streamlit app.
+
+Starts `streamlit run app.py` against the local stand-ins (tools/fake_dynamodb.py over HTTP,
+tools/fake_bedrock.py) and drives N simulated browser sessions over Streamlit's websocket
+protocol: landing page, login, then laps through Dashboard, Data Entry, AI Data Import,
+AI Analysis and one chat question. Every rerun (request until the script finished) is timed.
+
+A warm-up session runs first (imports, shared caches), it is not part of the results.
+Per concurrency level it reports rerun latency (p50/p95/p99, overall and per step),
+throughput, logins rejected by the password check backpressure (retried), server CPU per rerun and server RSS: growth per connected session and what is
+still held after the sessions disconnected (Streamlit keeps the session state of a closed tab
+for a while).
+
+Usage:
+    python tools/load_test.py [--concurrency 1,4,16] [--laps 3] [--meters 5]
+                              [--dynamo-latency-ms 5] [--first-token-ms 300] [--json results.json]
+Linux only for the server RSS/CPU numbers (/proc), latencies are measured everywhere.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, TOOLS_DIR)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+
+from fake_bedrock import start_server as start_bedrock
+from fake_dynamodb import FakeDynamoDB, start_server as start_dynamo
+from roundtrip_budget import seed
+
+PASSWORD = "load-test-password"
+QUESTION = "How did my consumption develop?"
+# (step name, sidebar button label); the question is asked on the AI Analysis page
+LAP = [
+    ("dashboard", "📊 Dashboard"),
+    ("data entry", "📝 Data Entry"),
+    ("ai import", "🤖 AI Data Import"),
+    ("ai analysis", "🤖 AI Analysis"),
+]
+FINISHED_EARLY_FOR_RERUN = ForwardMsg.ScriptFinishedStatus.Value("FINISHED_EARLY_FOR_RERUN")
+RERUN_TIMEOUT_SECONDS = 180
+# A login rejected by the password check backpressure ("Login is busy") is retried like a user would
+LOGIN_ATTEMPTS = 5
+LOGIN_RETRY_SECONDS = 1.0
+
+def percentile(values, pct: float):
+    """
+    Nearest-rank percentile, None for no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))]
+
+# --- Server process ---
+
+def _proc_stats(pid: int):
+    """
+    (RSS in MB, CPU seconds) of a process, (None, None) without /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return rss_kb / 1024, cpu_seconds
+    except (OSError, StopIteration, ValueError):
+        return None, None
+
+def start_app(workdir: str, port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(REPO_ROOT, "app.py"),
+         "--server.headless", "true", "--server.port", str(port),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "server.log"), "w")
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return process
+        except OSError:
+            time.sleep(0.3)
+    process.kill()
+    raise RuntimeError(f"Streamlit did not start, see {workdir}/server.log")
+
+# --- Simulated browser session ---
+
+class SimulatedSession:
+    """
+    Minimal Streamlit frontend: sends rerun requests with widget values and reads the
+    resulting ForwardMsgs until the script run is finished.
+    """
+    def __init__(self, url: str, username: str):
+        self.url = url
+        self.username = username
+        self.ws = None
+        self.query_string = ""
+        self.page_script_hash = ""
+        self.widgets = []  # (element type, label, form id, widget id) of the last run
+        self.timings = []  # (step, ms)
+        self.errors = []
+        self.rejected_logins = 0
+
+    def __enter__(self):
+        self.ws = connect(self.url, subprotocols=["streamlit"], max_size=None, open_timeout=30).__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.ws.__exit__(*exc)
+
+    def rerun(self, step: str, widget_states=None):
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        for state in widget_states or []:
+            msg.rerun_script.widget_states.widgets.append(state)
+
+        start = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(self.ws.recv(timeout=RERUN_TIMEOUT_SECONDS))
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                # Every script run (also after st.rerun()) starts with a new_session message
+                self.widgets = []
+                self.page_script_hash = fwd.new_session.page_script_hash
+            elif kind == "page_info_changed":
+                self.query_string = fwd.page_info_changed.query_string
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if element_type == "exception":
+                    self.errors.append(f"{step}: {proto.type}: {proto.message}")
+                elif getattr(proto, "id", ""):
+                    self.widgets.append((element_type, getattr(proto, "label", ""), getattr(proto, "form_id", ""), proto.id))
+            elif kind == "script_finished" and fwd.script_finished != FINISHED_EARLY_FOR_RERUN:
+                break
+        self.timings.append((step, (time.perf_counter() - start) * 1000))
+
+    def widget_id(self, element_type: str, label: str = None, form_id: str = None) -> str:
+        for kind, widget_label, widget_form, widget_id in self.widgets:
+            if kind == element_type and label in (None, widget_label) and form_id in (None, widget_form):
+                return widget_id
+        raise LookupError(f"{self.username}: no {element_type} {label!r} on the page")
+
+    def click(self, step: str, label: str):
+        state = BackMsg().rerun_script.widget_states.widgets.add()
+        state.id = self.widget_id("button", label)
+        state.trigger_value = True
+        self.rerun(step, [state])
+
+    def login(self, password: str):
+        states = []
+        for label, value in (("Username", self.username), ("Password", password)):
+            state = BackMsg().rerun_script.widget_states.widgets.add()
+            state.id = self.widget_id("text_input", label, "login_form")
+            state.string_value = value
+            states.append(state)
+        submit = BackMsg().rerun_script.widget_states.widgets.add()
+        submit.id = self.widget_id("button", "Login", "login_form")
+        submit.trigger_value = True
+        self.rerun("login", states + [submit])
+        return any(kind == "button" and label == LAP[0][1] for kind, label, _, _ in self.widgets)
+
+    def ask(self, question: str):
+        state = BackMsg().rerun_script.widget_states.widgets.add()
+        state.id = self.widget_id("chat_input")
+        state.chat_input_value.data = question
+        self.rerun("question", [state])
+
+def run_session(session: SimulatedSession, laps: int, think_seconds: float, connected: threading.Barrier):
+    """
+    One user: landing page, login, `laps` rounds through the pages. Waits at `connected`
+    (all sessions of the level done) before returning, so the RSS is measured with all sessions alive.
+    """
+    try:
+        session.rerun("landing")
+        for _ in range(LOGIN_ATTEMPTS):
+            if session.login(PASSWORD):
+                break
+            session.rejected_logins += 1
+            time.sleep(LOGIN_RETRY_SECONDS)
+        else:
+            raise RuntimeError(f"{session.username}: login rejected {LOGIN_ATTEMPTS} times")
+        for _ in range(laps):
+            for step, label in LAP:
+                time.sleep(think_seconds)
+                session.click(step, label)
+            time.sleep(think_seconds)
+            session.ask(QUESTION)
+    except Exception as e:
+        session.errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        connected.wait()
+
+# --- Load levels ---
+
+def run_level(url: str, pid: int, concurrency: int, laps: int, think_seconds: float):
+    rss_before, cpu_before = _proc_stats(pid)
+    sessions = [SimulatedSession(url, f"load{i}") for i in range(concurrency)]
+    # The last party is this thread, it samples the RSS while all sessions are still connected
+    connected = threading.Barrier(concurrency + 1)
+
+    start = time.perf_counter()
+    for session in sessions:
+        session.__enter__()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_session, s, laps, think_seconds, connected) for s in sessions]
+        connected.wait()
+        wall_seconds = time.perf_counter() - start
+        rss_connected, cpu_after = _proc_stats(pid)
+        for future in futures:
+            future.result()
+    for session in sessions:
+        session.__exit__(None, None, None)
+    time.sleep(2)
+    rss_disconnected, _ = _proc_stats(pid)
+
+    timings = [t for s in sessions for t in s.timings]
+    latencies = [ms for _, ms in timings]
+    steps = {}
+    for step, ms in timings:
+        steps.setdefault(step, []).append(ms)
+    return {
+        "concurrency": concurrency,
+        "reruns": len(timings),
+        "errors": [e for s in sessions for e in s.errors],
+        "rejected_logins": sum(s.rejected_logins for s in sessions),
+        "wall_seconds": wall_seconds,
+        "throughput_per_second": len(timings) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+        "steps": {step: {f"p{p}": percentile(values, p) for p in (50, 95, 99)} for step, values in steps.items()},
+        "cpu_ms_per_rerun": (cpu_after - cpu_before) * 1000 / len(timings) if timings and cpu_before is not None else None,
+        "rss_mb_before": rss_before,
+        "rss_mb_connected": rss_connected,
+        "rss_mb_disconnected": rss_disconnected,
+        "rss_mb_per_session": (rss_connected - rss_before) / concurrency if rss_before is not None else None,
+    }
+
+def _fmt(value, digits: int = 0) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+def print_report(results):
+    print(f"\n{'sessions':>8}{'reruns':>8}{'err':>5}{'busy':>5}{'rerun/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'cpu ms':>8}{'rss MB':>8}{'MB/sess':>9}{'held MB':>9}")
+    for r in results:
+        print(f"{r['concurrency']:>8}{r['reruns']:>8}{len(r['errors']):>5}{r['rejected_logins']:>5}{r['throughput_per_second']:>9.1f}"
+              f"{_fmt(r['latency_ms']['p50']):>9}{_fmt(r['latency_ms']['p95']):>9}{_fmt(r['latency_ms']['p99']):>9}"
+              f"{_fmt(r['cpu_ms_per_rerun']):>8}{_fmt(r['rss_mb_connected']):>8}{_fmt(r['rss_mb_per_session'], 1):>9}"
+              f"{_fmt(r['rss_mb_disconnected']):>9}")
+
+    print("\np95 per step (ms):")
+    steps = list(results[0]["steps"]) if results else []
+    print(f"{'sessions':>8}" + "".join(f"{step:>13}" for step in steps))
+    for r in results:
+        print(f"{r['concurrency']:>8}" + "".join(f"{_fmt(r['steps'].get(step, {}).get('p95')):>13}" for step in steps))
+
+    for r in results:
+        for error in r["errors"][:5]:
+            print(f"  [{r['concurrency']} sessions] {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated session counts, run one after the other")
+    parser.add_argument("--laps", type=int, default=3, help="Rounds through the pages per session")
+    parser.add_argument("--meters", type=int, default=5, help="Meters per simulated user")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause before every interaction")
+    parser.add_argument("--dynamo-latency-ms", type=float, default=5.0)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    from src.logic.sessions import hash_password
+    password_hash = hash_password(PASSWORD)
+    store = FakeDynamoDB.for_app()
+    for i in range(max(levels)):
+        seed(store, args.meters, username=f"load{i}", password_hash=password_hash)
+
+    dynamo = start_dynamo(store, latency_ms=args.dynamo_latency_ms)
+    bedrock = start_bedrock(first_token_ms=args.first_token_ms, tokens_per_second=args.tokens_per_second)
+
+    # The server gets its own working directory for secrets, caches, jobs and metric exports
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f'SESSION_SECRET = "load-test"\n'
+                f'DYNAMODB_ENDPOINT_URL = "http://127.0.0.1:{dynamo.server_port}"\n'
+                f'BEDROCK_ENDPOINT_URL = "http://127.0.0.1:{bedrock.server_port}"\n')
+    env = {k: v for k, v in os.environ.items() if not k.startswith("AWS_")}
+    env["PYTHONPATH"] = REPO_ROOT
+
+    print(f"Server working directory: {workdir}")
+    server = start_app(workdir, args.port, env)
+    url = f"ws://127.0.0.1:{args.port}/_stcore/stream"
+    results = []
+    try:
+        print("Warm-up...")
+        run_level(url, server.pid, 1, 1, 0.0)
+        for concurrency in levels:
+            print(f"Running {concurrency} session(s)...")
+            results.append(run_level(url, server.pid, concurrency, args.laps, args.think_ms / 1000))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        dynamo.shutdown()
+        bedrock.shutdown()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if any(r["errors"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Converts the readings in meter_reading_bot between the single-item layout (one item per reading)
+and the packed layout (one item per meter and year, see src/data/packing.py).
+
+Uses the app's DynamoDB configuration (.streamlit/secrets.toml / environment, incl.
+DYNAMODB_ENDPOINT_URL), run it from the repository root. Reads understand both layouts at any
+time, so the app can keep running. Migrate to packed before setting PACKED_READINGS=1, and back
+to single items (--to items) after turning it off again.
+
+Usage:
+    python tools/migrate_packed_readings.py [--to packed|items] [--user USERNAME ...] [--dry-run]
+Running app processes keep serving their cached readings until the user's next write.
+"""
+import argparse
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.data.db_handler import DBHandler
+
+def list_users(db: DBHandler):
+    """
+    (username, user_id) of all users.
+    """
+    users, start_key = [], None
+    while True:
+        params = {'TableName': db.USER_TABLE_NAME}
+        if start_key:
+            params['ExclusiveStartKey'] = start_key
+        response = db.dynamo.scan(**params)
+        users.extend((item['username']['S'], item.get('user_id', {}).get('S', '')) for item in response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return users
+
+def migrate(db: DBHandler, packed: bool, usernames=None, dry_run: bool = False) -> bool:
+    """
+    Converts all meters of the given (default: all) users. Returns False if a partition failed.
+    """
+    totals = {"meters": 0, "readings": 0, "written": 0, "deleted": 0}
+    ok = True
+    for username, user_id in list_users(db):
+        if usernames and username not in usernames or not user_id:
+            continue
+        for meter_type in db.get_meter_types(user_id):
+            try:
+                result = db.convert_readings_layout(user_id, meter_type, packed, dry_run)
+            except Exception as e:
+                # Old items are only deleted after all new ones were written, nothing is lost
+                print(f"  {username} / {meter_type}: FAILED ({e}), run again")
+                ok = False
+                continue
+            totals["meters"] += 1
+            for key in ("readings", "written", "deleted"):
+                totals[key] += result[key]
+            if result["deleted"]:
+                print(f"  {username} / {meter_type}: {result['readings']} readings, "
+                      f"{result['written']} items written, {result['deleted']} deleted")
+
+    action = "Would convert" if dry_run else "Converted"
+    print(f"{action} {totals['meters']} meters ({totals['readings']} readings) to the "
+          f"{'packed' if packed else 'single-item'} layout: {totals['written']} items written, "
+          f"{totals['deleted']} deleted")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert readings between the single-item and the packed layout")
+    parser.add_argument("--to", choices=["packed", "items"], default="packed")
+    parser.add_argument("--user", action="append", help="Only this username (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count, write nothing")
+    args = parser.parse_args()
+
+    if not migrate(DBHandler(), args.to == "packed", args.user, args.dry_run):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+DynamoDB round-trip budgets per page.
+
+Renders every page function headlessly (streamlit.testing AppTest) against the in-process
+DynamoDB stand-in (tools/fake_dynamodb.py) for users with 1, 10 and 50 meters and checks
+round trips, items read and wall time against BUDGETS. The AI question scenario runs
+against tools/fake_bedrock.py (no latency).
+
+Usage:
+    python tools/roundtrip_budget.py [--meters 1,10,50] [--pages Dashboard,Data Entry] [--packed]
+--packed stores and reads the readings in the packed per-year layout (PACKED_READINGS).
+Exits with 1 if a budget is exceeded. Adjust BUDGETS deliberately, in the same change that
+needs the extra calls.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, TOOLS_DIR)
+
+from fake_bedrock import start_server
+from fake_dynamodb import FakeDynamoClient, FakeDynamoDB
+
+READINGS_PER_METER = 36
+
+# Page -> limits as functions of the meter count n (R = READINGS_PER_METER).
+# Pages reading meter data pay one consistent GetItem of the data versions (see DBHandler).
+R = READINGS_PER_METER
+BUDGETS = {
+    "Dashboard": {
+        "round_trips": lambda n: 2 + 2 * n,
+        "items_read": lambda n: 2 + n * (R + 1),
+        "wall_ms": lambda n: 1500 + 150 * n,
+    },
+    # Every tab renders on each rerun: one readings query per meter in the edit/delete tab
+    "Data Entry": {
+        "round_trips": lambda n: 2 + n,
+        "items_read": lambda n: 2 + n * R,
+        "wall_ms": lambda n: 1500 + 50 * n,
+    },
+    "AI Data Import": {
+        "round_trips": lambda n: 0,
+        "items_read": lambda n: 0,
+        "wall_ms": lambda n: 1000,
+    },
+    "AI Analysis": {
+        "round_trips": lambda n: 0,
+        "items_read": lambda n: 0,
+        "wall_ms": lambda n: 1000,
+    },
+    # First question: data context (all meters) + quota reservation
+    "AI Analysis (question)": {
+        "round_trips": lambda n: 3 + 2 * n,
+        "items_read": lambda n: 2 + n * (R + 1),
+        "wall_ms": lambda n: 2000 + 80 * n,
+    },
+    "Define Data Categories": {
+        "round_trips": lambda n: 2 + n,
+        "items_read": lambda n: 2 + n,
+        "wall_ms": lambda n: 1500 + 50 * n,
+    },
+}
+
+def seed(store: FakeDynamoDB, meters: int, username: str = None, password_hash: str = "", packed: bool = False):
+    """
+    One user with `meters` meters, READINGS_PER_METER monthly readings each.
+    Returns the User.
+    """
+    from src.data.db_handler import DBHandler
+    from src.data.models import MeterReading, User
+
+    username = username or f"budget{meters}"
+    user = User(username=username, user_id=f"{username}-id", password_hash=password_hash, created_at="2024-01-01")
+    db = DBHandler(dynamo_client=FakeDynamoClient(store), packed_readings=packed)
+    db.create_user(user)
+    meter_types = [f"Meter {i + 1}" for i in range(meters)]
+    db.update_meter_types(user.user_id, meter_types)
+    for i, meter_type in enumerate(meter_types):
+        db.update_meter_config(user.user_id, meter_type, 'unit', "kWh")
+        db.update_meter_config(user.user_id, meter_type, 'eval_mode', 'difference' if i % 2 == 0 else 'absolute')
+        value = 1000.0
+        for month in range(READINGS_PER_METER):
+            value += 80 + (month % 12) * 5
+            reading_date = date(2022 + month // 12, month % 12 + 1, 1).isoformat()
+            db.add_reading(user.user_id, MeterReading(meter_type, value, reading_date))
+    return user
+
+def _page_script(page, client, user, packed):
+    import time
+    import importlib
+    import streamlit as st
+    from app import PAGES
+    from src.data.db_handler import DBHandler
+
+    module_name, function_name = PAGES[page]
+    page_function = getattr(importlib.import_module(module_name), function_name)
+    start = time.perf_counter()
+    try:
+        page_function(DBHandler(dynamo_client=client, packed_readings=packed), user)
+    finally:
+        st.session_state["_budget_wall_ms"] = (time.perf_counter() - start) * 1000
+
+def measure(page: str, store: FakeDynamoDB, user, bedrock_url: str, packed: bool = False):
+    from streamlit.testing.v1 import AppTest
+    from src.data import db_handler
+    from src.logic.cache import shared_cache
+
+    # Budgets are for a cold cache (first visit after a restart or a write)
+    shared_cache.invalidate()
+    db_handler.clear_data_versions()
+    # One version read per render: slow renders (50 meters) must not count a second one after the
+    # staleness window passed
+    db_handler.DATA_VERSION_MAX_AGE_SECONDS = 3600
+    client = FakeDynamoClient(store)
+    page_name = page.replace(" (question)", "")
+    at = AppTest.from_function(_page_script, args=(page_name, client, user, packed), default_timeout=120)
+    at.secrets["BEDROCK_ENDPOINT_URL"] = bedrock_url
+    at.run()
+    if page.endswith("(question)"):
+        # Only the rerun answering the question counts
+        client.reset_stats()
+        at.chat_input[0].set_value("Wie hat sich mein Verbrauch entwickelt?")
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+    return {
+        "round_trips": client.stats["round_trips"],
+        "items_read": client.stats["items_read"],
+        "wall_ms": at.session_state["_budget_wall_ms"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="DynamoDB round-trip budgets per page")
+    parser.add_argument("--meters", default="1,10,50")
+    parser.add_argument("--pages", default=",".join(BUDGETS))
+    parser.add_argument("--packed", action="store_true", help="Packed per-year reading items")
+    args = parser.parse_args()
+
+    # Caches, jobs and traces of the run go to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="roundtrip-budget-"))
+    bedrock = start_server(first_token_ms=0, tokens_per_second=100000, output_tokens=20)
+    bedrock_url = f"http://127.0.0.1:{bedrock.server_port}"
+
+    failures = []
+    print(f"{'page':<26}{'meters':>7}{'trips':>8}{'items':>8}{'wall ms':>10}")
+    for meters in [int(m) for m in args.meters.split(",")]:
+        store = FakeDynamoDB.for_app()
+        user = seed(store, meters, packed=args.packed)
+        for page in [p.strip() for p in args.pages.split(",")]:
+            result = measure(page, store, user, bedrock_url, args.packed)
+            marks = []
+            for metric, limit in BUDGETS[page].items():
+                if result[metric] > limit(meters):
+                    marks.append(metric)
+                    failures.append(f"{page} ({meters} meters): {metric} {result[metric]:.0f} > {limit(meters):.0f}")
+            print(f"{page:<26}{meters:>7}{result['round_trips']:>8}{result['items_read']:>8}"
+                  f"{result['wall_ms']:>10.0f}  {'FAIL ' + ', '.join(marks) if marks else 'ok'}")
+
+    bedrock.shutdown()
+    if failures:
+        print("\nBudget exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll budgets met")
+
+if __name__ == "__main__":
+    main()